@@ -1,28 +1,46 @@
 from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request, Query, Response
+from pydantic import TypeAdapter
+from sqlalchemy import and_, insert, or_, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import aliased, joinedload, load_only, raiseload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlmodel import select
 
 from app.core import get_session, get_current_user
 from app.models import (
     User, UserRole, UserRead,
     Appointment, AppointmentCreate, AppointmentRead, AppointmentUpdate, AppointmentStatus,
-    AuditAction
+    AuditAction, IdStr
 )
-from app.services import get_audit_service
+from app.services import BackgroundAuditService, get_background_audit_service
 from app.services.notification import NotificationService
 
 router = APIRouter(prefix="/appointments", tags=["Appointments"])
 
+# Column projection used by list_appointments (see _row_to_read)
+_Doctor = aliased(User, name="doctor")
+_Patient = aliased(User, name="patient")
+_APPOINTMENT_COLUMNS = (
+    "id", "meeting_number", "doctor_id", "patient_id", "scheduled_time",
+    "reason", "notes", "status", "room_id", "created_at"
+)
+_PARTY_COLUMNS = ("id", "email", "full_name", "role", "is_active", "created_at")
+
+# Serializes list pages in one pass; returning the models would make FastAPI
+# dump each one to a dict and validate it all over again
+_APPOINTMENT_LIST = TypeAdapter(List[AppointmentRead])
+
 
 @router.post("/", response_model=AppointmentRead, status_code=status.HTTP_201_CREATED)
 async def create_appointment(
     request: Request,
+    background_tasks: BackgroundTasks,
     appointment_data: AppointmentCreate,
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    audit_service: BackgroundAuditService = Depends(get_background_audit_service)
 ):
     """Create a new appointment (patients only)."""
     if current_user.role != UserRole.PATIENT:
@@ -31,9 +49,14 @@ async def create_appointment(
             detail="Only patients can create appointments"
         )
     
-    # Verify doctor exists
+    # Verify doctor exists, loading only the columns the response and emails use
     result = await session.execute(
-        select(User).where(User.id == appointment_data.doctor_id, User.role == UserRole.DOCTOR)
+        select(User)
+        .options(load_only(
+            User.id, User.email, User.full_name, User.role, User.is_active, User.created_at,
+            raiseload=True
+        ))
+        .where(User.id == appointment_data.doctor_id, User.role == UserRole.DOCTOR)
     )
     doctor = result.scalar_one_or_none()
     if not doctor:
@@ -42,31 +65,39 @@ async def create_appointment(
             detail="Doctor not found"
         )
     
-    # Create appointment
-    appointment = Appointment(
-        doctor_id=appointment_data.doctor_id,
-        patient_id=current_user.id,
-        scheduled_time=appointment_data.scheduled_time,
-        reason=appointment_data.reason,
-        notes=appointment_data.notes
+    # Create appointment; RETURNING hands back the generated defaults in the
+    # same round-trip, and expire_on_commit=False keeps them loaded
+    result = await session.execute(
+        insert(Appointment)
+        .values(
+            doctor_id=appointment_data.doctor_id,
+            patient_id=current_user.id,
+            scheduled_time=appointment_data.scheduled_time,
+            reason=appointment_data.reason,
+            notes=appointment_data.notes
+        )
+        .returning(Appointment)
     )
-    
-    session.add(appointment)
+    appointment = result.scalar_one()
     await session.commit()
-    await session.refresh(appointment)
+    
+    # Both users are already loaded; attach them without another SELECT
+    set_committed_value(appointment, "doctor", doctor)
+    set_committed_value(appointment, "patient", current_user)
     
     # Send Notification
     try:
         notif_service = NotificationService(session)
         await notif_service.notify_appointment_booking(appointment, current_user, doctor)
     except Exception as e:
-        # Don't fail the appointment creation if notification fails
-        print(f"Failed to send notifications: {e}")
+        # Don't fail the appointment creation if notification fails; email
+        # delivery errors surface later in the email sender's log
+        print(f"Failed to create notifications: {e}")
 
-    # Log the creation
-    audit_service = get_audit_service(session)
+    # Log the creation after the response is sent
     client_ip = request.client.host if request.client else None
-    await audit_service.log(
+    background_tasks.add_task(
+        audit_service.log,
         user_id=current_user.id,
         action=AuditAction.CREATE_APPOINTMENT,
         resource_type="appointment",
@@ -74,28 +105,34 @@ async def create_appointment(
         ip_address=client_ip
     )
     
-    # Load relationships for response
-    result = await session.execute(
-        select(Appointment)
-        .options(selectinload(Appointment.doctor), selectinload(Appointment.patient))
-        .where(Appointment.id == appointment.id)
-    )
-    appointment = result.scalar_one()
-    
     return _appointment_to_read(appointment)
 
 
 @router.get("/", response_model=List[AppointmentRead])
 async def list_appointments(
     request: Request,
+    response: Response,
     status_filter: Optional[AppointmentStatus] = Query(None, alias="status"),
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[datetime] = Query(None),
+    before_id: Optional[IdStr] = Query(None),
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """List appointments for current user."""
-    query = select(Appointment).options(
-        selectinload(Appointment.doctor),
-        selectinload(Appointment.patient)
+    """List appointments for current user.
+    
+    Paginated by keyset: pass the X-Next-Cursor header of the previous page
+    back as `before` and `before_id` to fetch the next (earlier) page.
+    """
+    # Project plain columns (no ORM objects) for both participants
+    query = (
+        select(
+            *[getattr(Appointment, name) for name in _APPOINTMENT_COLUMNS],
+            *[getattr(_Doctor, name).label(f"doctor_{name}") for name in _PARTY_COLUMNS],
+            *[getattr(_Patient, name).label(f"patient_{name}") for name in _PARTY_COLUMNS]
+        )
+        .join(_Doctor, Appointment.doctor_id == _Doctor.id)
+        .join(_Patient, Appointment.patient_id == _Patient.id)
     )
     
     # Filter by user role
@@ -108,25 +145,47 @@ async def list_appointments(
     if status_filter:
         query = query.where(Appointment.status == status_filter)
     
-    query = query.order_by(Appointment.scheduled_time.desc())
+    # Keyset cursor: resume strictly after the last row of the previous page
+    if before:
+        if before_id:
+            query = query.where(or_(
+                Appointment.scheduled_time < before,
+                and_(Appointment.scheduled_time == before, Appointment.id < before_id)
+            ))
+        else:
+            query = query.where(Appointment.scheduled_time < before)
     
-    result = await session.execute(query)
-    appointments = result.scalars().all()
+    query = query.order_by(Appointment.scheduled_time.desc(), Appointment.id.desc()).limit(limit)
     
-    return [_appointment_to_read(apt) for apt in appointments]
+    result = await session.execute(query)
+    rows = result.all()
+    
+    # A full page means there may be more rows; hand back the resume point
+    headers = {}
+    if len(rows) == limit:
+        last = rows[-1]
+        headers["X-Next-Cursor"] = f"{last.scheduled_time.isoformat()},{last.id}"
+    
+    return Response(
+        content=_APPOINTMENT_LIST.dump_json([_row_to_read(row) for row in rows]),
+        media_type="application/json",
+        headers=headers
+    )
 
 
 @router.get("/{appointment_id}", response_model=AppointmentRead)
 async def get_appointment(
-    appointment_id: str,
+    appointment_id: IdStr,
     request: Request,
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    audit_service: BackgroundAuditService = Depends(get_background_audit_service)
 ):
     """Get a specific appointment."""
     result = await session.execute(
         select(Appointment)
-        .options(selectinload(Appointment.doctor), selectinload(Appointment.patient))
+        .options(joinedload(Appointment.doctor), joinedload(Appointment.patient), raiseload("*"))
         .where(Appointment.id == appointment_id)
     )
     appointment = result.scalar_one_or_none()
@@ -144,46 +203,85 @@ async def get_appointment(
             detail="Access denied"
         )
     
-    # Log the view
-    audit_service = get_audit_service(session)
+    # Log the view after the response is sent
     client_ip = request.client.host if request.client else None
-    await audit_service.log_appointment_view(current_user.id, appointment_id, client_ip)
+    background_tasks.add_task(audit_service.log_appointment_view, current_user.id, appointment_id, client_ip)
     
     return _appointment_to_read(appointment)
 
 
 @router.patch("/{appointment_id}", response_model=AppointmentRead)
 async def update_appointment(
-    appointment_id: str,
+    appointment_id: IdStr,
     update_data: AppointmentUpdate,
     request: Request,
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    audit_service: BackgroundAuditService = Depends(get_background_audit_service)
 ):
     """Update an appointment (doctors can confirm/cancel, patients can cancel)."""
-    result = await session.execute(
-        select(Appointment)
-        .options(selectinload(Appointment.doctor), selectinload(Appointment.patient))
-        .where(Appointment.id == appointment_id)
-    )
-    appointment = result.scalar_one_or_none()
-    
-    if not appointment:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Appointment not found"
+    if update_data.status is None:
+        # Plain edits need no pre-read: the access check, the write and the
+        # re-read fuse into one UPDATE ... RETURNING. The caller is already in
+        # the identity map, so selectinload only has to fetch the other party.
+        values = {"updated_at": datetime.utcnow()}
+        if update_data.scheduled_time:
+            values["scheduled_time"] = update_data.scheduled_time
+        if update_data.notes is not None:
+            values["notes"] = update_data.notes
+        
+        result = await session.execute(
+            update(Appointment)
+            .where(
+                Appointment.id == appointment_id,
+                or_(Appointment.doctor_id == current_user.id, Appointment.patient_id == current_user.id)
+            )
+            .values(**values)
+            .returning(Appointment)
+            .options(selectinload(Appointment.doctor), selectinload(Appointment.patient), raiseload("*"))
         )
-    
-    # Verify access
-    if current_user.id not in [appointment.doctor_id, appointment.patient_id]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied"
+        appointment = result.scalar_one_or_none()
+        
+        if not appointment:
+            # No row matched; tell "not yours" (403, as on the status path)
+            # apart from "doesn't exist" with a lookup on this failure path only
+            found = await session.scalar(select(Appointment.id).where(Appointment.id == appointment_id))
+            if found is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Appointment not found"
+                )
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied"
+            )
+        
+        await session.commit()
+        old_status = appointment.status
+    else:
+        result = await session.execute(
+            select(Appointment)
+            .options(joinedload(Appointment.doctor), joinedload(Appointment.patient), raiseload("*"))
+            .where(Appointment.id == appointment_id)
         )
-    
-    # Apply status rules
-    old_status = appointment.status
-    if update_data.status:
+        appointment = result.scalar_one_or_none()
+        
+        if not appointment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Appointment not found"
+            )
+        
+        # Verify access
+        if current_user.id not in [appointment.doctor_id, appointment.patient_id]:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied"
+            )
+        
+        # Apply status rules
+        old_status = appointment.status
         if update_data.status == AppointmentStatus.CONFIRMED:
             if current_user.role != UserRole.DOCTOR:
                 raise HTTPException(
@@ -198,17 +296,16 @@ async def update_appointment(
                 )
         
         appointment.status = update_data.status
-    
-    if update_data.scheduled_time:
-        appointment.scheduled_time = update_data.scheduled_time
-    
-    if update_data.notes is not None:
-        appointment.notes = update_data.notes
-    
-    appointment.updated_at = datetime.utcnow()
-    
-    await session.commit()
-    await session.refresh(appointment)
+        
+        if update_data.scheduled_time:
+            appointment.scheduled_time = update_data.scheduled_time
+        
+        if update_data.notes is not None:
+            appointment.notes = update_data.notes
+        
+        appointment.updated_at = datetime.utcnow()
+        
+        await session.commit()
     
     # Send notifications based on status change
     if update_data.status and update_data.status != old_status:
@@ -223,12 +320,13 @@ async def update_appointment(
                 cancelled_by_role = "doctor" if current_user.role == UserRole.DOCTOR else "patient"
                 await notif_service.notify_appointment_cancelled(appointment, patient, doctor, cancelled_by_role)
         except Exception as e:
-            print(f"Failed to send status change notification: {e}")
+            # Email delivery errors are logged by the email sender, not here
+            print(f"Failed to create status change notification: {e}")
     
-    # Log the update
-    audit_service = get_audit_service(session)
+    # Log the update after the response is sent
     client_ip = request.client.host if request.client else None
-    await audit_service.log(
+    background_tasks.add_task(
+        audit_service.log,
         user_id=current_user.id,
         action=AuditAction.UPDATE_APPOINTMENT,
         resource_type="appointment",
@@ -242,50 +340,82 @@ async def update_appointment(
 
 @router.get("/{appointment_id}/room", response_model=dict)
 async def get_appointment_room(
-    appointment_id: str,
+    appointment_id: IdStr,
     request: Request,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get the room ID for an appointment's video call."""
+    # Read fresh on every call: status gates access, and a per-process
+    # cache would keep serving a cancelled room on the other workers
     result = await session.execute(
-        select(Appointment).where(Appointment.id == appointment_id)
+        select(
+            Appointment.doctor_id,
+            Appointment.patient_id,
+            Appointment.status,
+            Appointment.room_id,
+            Appointment.meeting_number,
+            Appointment.scheduled_time
+        ).where(Appointment.id == appointment_id)
     )
-    appointment = result.scalar_one_or_none()
+    room = result.mappings().one_or_none()
     
-    if not appointment:
+    if room is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Appointment not found"
         )
     
-    if current_user.id not in [appointment.doctor_id, appointment.patient_id]:
+    if current_user.id not in [room["doctor_id"], room["patient_id"]]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
         )
     
-    if appointment.status not in [AppointmentStatus.CONFIRMED, AppointmentStatus.PENDING]:
+    if room["status"] not in [AppointmentStatus.CONFIRMED, AppointmentStatus.PENDING]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Appointment is not active"
         )
     
     return {
-        "room_id": appointment.room_id,
-        "appointment_id": appointment.id,
-        "meeting_number": appointment.meeting_number,
-        "scheduled_time": appointment.scheduled_time.isoformat()
+        "room_id": room["room_id"],
+        "appointment_id": appointment_id,
+        "meeting_number": room["meeting_number"],
+        "scheduled_time": room["scheduled_time"].isoformat()
     }
 
 
+def _row_to_read(row) -> AppointmentRead:
+    """Convert a list_appointments projection row to AppointmentRead."""
+    mapping = row._mapping
+    return AppointmentRead.model_construct(
+        **{name: mapping[name] for name in _APPOINTMENT_COLUMNS},
+        doctor=UserRead.model_construct(
+            **{name: mapping[f"doctor_{name}"] for name in _PARTY_COLUMNS}
+        ),
+        patient=UserRead.model_construct(
+            **{name: mapping[f"patient_{name}"] for name in _PARTY_COLUMNS}
+        )
+    )
+
+
+# Every query feeding _appointment_to_read eager-loads doctor and patient with
+# joinedload() and adds raiseload("*") (create_appointment attaches the users it
+# already holds via set_committed_value), so a relationship that was not loaded
+# up front raises immediately instead of lazy-loading (MissingGreenlet under
+# asyncio, or a hidden extra round-trip per row).
 def _appointment_to_read(appointment: Appointment) -> AppointmentRead:
-    """Convert Appointment model to AppointmentRead."""
+    """Convert Appointment model to AppointmentRead.
+    
+    Uses model_construct: the values come straight from already-validated
+    DB rows, so per-field validation would only repeat work.
+    """
     doctor_read = None
     patient_read = None
     
     if appointment.doctor:
-        doctor_read = UserRead(
+        doctor_read = UserRead.model_construct(
             id=appointment.doctor.id,
             email=appointment.doctor.email,
             full_name=appointment.doctor.full_name,
@@ -295,7 +425,7 @@ def _appointment_to_read(appointment: Appointment) -> AppointmentRead:
         )
     
     if appointment.patient:
-        patient_read = UserRead(
+        patient_read = UserRead.model_construct(
             id=appointment.patient.id,
             email=appointment.patient.email,
             full_name=appointment.patient.full_name,
@@ -304,7 +434,7 @@ def _appointment_to_read(appointment: Appointment) -> AppointmentRead:
             created_at=appointment.patient.created_at
         )
     
-    return AppointmentRead(
+    return AppointmentRead.model_construct(
         id=appointment.id,
         meeting_number=appointment.meeting_number,
         doctor_id=appointment.doctor_id,
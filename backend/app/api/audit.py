@@ -1,16 +1,30 @@
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
 from app.core import get_session, get_current_user
-from app.models import User, UserRole, AuditLog, AuditLogRead, AuditAction
+from app.core.database import async_session
+from app.models import User, UserRole, AuditLog, AuditLogRead, AuditAction, IdStr
 
 router = APIRouter(prefix="/audit", tags=["Audit Logs"])
 
+# Used by get_my_activity; list_audit_logs streams NDJSON instead
+_AUDIT_LOG_LIST = TypeAdapter(List[AuditLogRead])
 
-@router.get("/", response_model=List[AuditLogRead])
+
+@router.get(
+    "/",
+    response_class=StreamingResponse,
+    responses={200: {
+        "description": "NDJSON stream, one AuditLogRead object per line",
+        "content": {"application/x-ndjson": {"schema": {"$ref": "#/components/schemas/AuditLogRead"}}}
+    }}
+)
 async def list_audit_logs(
     action: Optional[AuditAction] = Query(None),
     resource_type: Optional[str] = Query(None),
@@ -18,11 +32,16 @@ async def list_audit_logs(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     limit: int = Query(100, le=1000),
-    offset: int = Query(0),
-    session: AsyncSession = Depends(get_session),
+    before: Optional[datetime] = Query(None),
+    before_id: Optional[IdStr] = Query(None),
     current_user: User = Depends(get_current_user)
 ):
-    """List audit logs (doctors see their patients' logs, patients see their own)."""
+    """List audit logs (doctors see their patients' logs, patients see their own).
+    
+    Streamed as NDJSON, one AuditLogRead per line. Paginated by keyset: pass
+    the created_at and id of the last line back as `before` and `before_id`
+    to fetch the next (older) page.
+    """
     query = select(AuditLog)
     
     # Role-based filtering
@@ -46,24 +65,37 @@ async def list_audit_logs(
     if end_date:
         query = query.where(AuditLog.created_at <= end_date)
     
-    query = query.order_by(AuditLog.created_at.desc()).offset(offset).limit(limit)
+    # Keyset cursor: resume strictly after the last row of the previous page
+    if before:
+        if before_id:
+            query = query.where(or_(
+                AuditLog.created_at < before,
+                and_(AuditLog.created_at == before, AuditLog.id < before_id)
+            ))
+        else:
+            query = query.where(AuditLog.created_at < before)
     
-    result = await session.execute(query)
-    logs = result.scalars().all()
+    query = query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit)
     
-    return [
-        AuditLogRead(
-            id=log.id,
-            user_id=log.user_id,
-            action=log.action,
-            resource_type=log.resource_type,
-            resource_id=log.resource_id,
-            details=log.details,
-            ip_address=log.ip_address,
-            created_at=log.created_at
-        )
-        for log in logs
-    ]
+    async def generate():
+        # The request session is already closed once the body streams, so
+        # read through a server-side cursor on a session of our own; memory
+        # stays bounded by yield_per regardless of limit
+        async with async_session() as stream_session:
+            result = await stream_session.stream(query.execution_options(yield_per=100))
+            async for log in result.scalars():
+                yield AuditLogRead.model_construct(
+                    id=log.id,
+                    user_id=log.user_id,
+                    action=log.action,
+                    resource_type=log.resource_type,
+                    resource_id=log.resource_id,
+                    details=log.details,
+                    ip_address=log.ip_address,
+                    created_at=log.created_at
+                ).model_dump_json() + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 @router.get("/my-activity", response_model=List[AuditLogRead])
@@ -81,8 +113,8 @@ async def get_my_activity(
     )
     logs = result.scalars().all()
     
-    return [
-        AuditLogRead(
+    return Response(content=_AUDIT_LOG_LIST.dump_json([
+        AuditLogRead.model_construct(
             id=log.id,
             user_id=log.user_id,
             action=log.action,
@@ -93,4 +125,4 @@ async def get_my_activity(
             created_at=log.created_at
         )
         for log in logs
-    ]
+    ]), media_type="application/json")
@@ -1,17 +1,29 @@
-from datetime import timedelta
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from typing import List, Optional
+from cachetools import TTLCache
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import TypeAdapter
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from sqlmodel import select
 
-from app.core import get_session, get_settings, get_password_hash, verify_password, create_access_token, get_current_user
+from app.core import get_session, get_settings, get_password_hash, verify_password, create_access_token, get_current_user, invalidate_user
 from app.models import User, UserCreate, UserRead, UserLogin, Token, UserRole
-from app.services import get_audit_service, AuditService
+from app.services import BackgroundAuditService, get_background_audit_service
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 settings = get_settings()
 
+# Columns exposed by UserRead (skips password_hash and updated_at)
+_USER_READ_COLUMNS = [getattr(User, name) for name in UserRead.model_fields]
+
+# (limit, offset) -> serialized list[UserRead]; cleared when a doctor registers
+# on this worker only (see doctor_list_cache_ttl_seconds)
+_doctor_list_cache: TTLCache = TTLCache(maxsize=64, ttl=settings.doctor_list_cache_ttl_seconds)
+_USER_LIST = TypeAdapter(List[UserRead])
+
 
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
 async def register(
@@ -19,38 +31,45 @@ async def register(
     session: AsyncSession = Depends(get_session)
 ):
     """Register a new user (doctor or patient)."""
-    # Check if email already exists
-    result = await session.execute(select(User).where(User.email == user_data.email))
-    existing_user = result.scalar_one_or_none()
+    # Hashing is CPU-bound; keep it off the event loop
+    password_hash = await run_in_threadpool(get_password_hash, user_data.password)
+    
+    # Create new user; the unique email index turns a duplicate into a no-op,
+    # so the existence check, insert and re-read are one statement
+    result = await session.execute(
+        pg_insert(User)
+        .values(
+            email=user_data.email,
+            full_name=user_data.full_name,
+            role=user_data.role,
+            phone=user_data.phone,
+            password_hash=password_hash,
+            # Patient-specific fields
+            date_of_birth=user_data.date_of_birth,
+            blood_group=user_data.blood_group,
+            emergency_contact=user_data.emergency_contact,
+            address=user_data.address,
+            # Doctor-specific fields
+            specialization=user_data.specialization,
+            license_number=user_data.license_number,
+            hospital_affiliation=user_data.hospital_affiliation,
+            years_of_experience=user_data.years_of_experience
+        )
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(User)
+    )
+    user = result.scalar_one_or_none()
     
-    if existing_user:
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Create new user
-    user = User(
-        email=user_data.email,
-        full_name=user_data.full_name,
-        role=user_data.role,
-        phone=user_data.phone,
-        password_hash=get_password_hash(user_data.password),
-        # Patient-specific fields
-        date_of_birth=user_data.date_of_birth,
-        blood_group=user_data.blood_group,
-        emergency_contact=user_data.emergency_contact,
-        address=user_data.address,
-        # Doctor-specific fields
-        specialization=user_data.specialization,
-        license_number=user_data.license_number,
-        hospital_affiliation=user_data.hospital_affiliation,
-        years_of_experience=user_data.years_of_experience
-    )
-    
-    session.add(user)
     await session.commit()
-    await session.refresh(user)
+    
+    if user.role == UserRole.DOCTOR:
+        _doctor_list_cache.clear()
     
     return user
 
@@ -58,58 +77,79 @@ async def register(
 @router.post("/login", response_model=Token)
 async def login(
     request: Request,
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_session),
+    audit_service: BackgroundAuditService = Depends(get_background_audit_service)
 ):
     """Login and get access token."""
-    # Find user by email
-    result = await session.execute(select(User).where(User.email == form_data.username))
-    user = result.scalar_one_or_none()
-    
-    if not user or not verify_password(form_data.password, user.password_hash):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Account is inactive"
-        )
-    
-    # Create access token
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user.id, "role": user.role.value},
-        expires_delta=access_token_expires
+    return await _authenticate(
+        session, form_data.username, form_data.password, request, background_tasks, audit_service
     )
-    
-    # Log the login
-    audit_service = get_audit_service(session)
-    client_ip = request.client.host if request.client else None
-    await audit_service.log_login(user.id, client_ip)
-    
-    return {
-        "access_token": access_token, 
-        "token_type": "bearer",
-        "user_id": user.id,
-        "role": user.role
-    }
 
 
 @router.post("/login/json", response_model=Token)
 async def login_json(
     request: Request,
+    background_tasks: BackgroundTasks,
     credentials: UserLogin,
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_session),
+    audit_service: BackgroundAuditService = Depends(get_background_audit_service)
 ):
     """Login with JSON body and get access token."""
-    result = await session.execute(select(User).where(User.email == credentials.email))
+    return await _authenticate(
+        session, credentials.email, credentials.password, request, background_tasks, audit_service
+    )
+
+
+@router.get("/me", response_model=UserRead)
+async def get_current_user_info(
+    current_user: User = Depends(get_current_user)
+):
+    """Get current logged-in user information."""
+    return current_user
+
+
+@router.get("/doctors", response_model=list[UserRead])
+async def list_doctors(
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """List all doctors (for patients to select)."""
+    cached = _doctor_list_cache.get((limit, offset))
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    result = await session.execute(
+        select(User)
+        .options(load_only(*_USER_READ_COLUMNS))
+        .where(User.role == UserRole.DOCTOR, User.is_active == True)
+        .order_by(User.full_name, User.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    # Validate the ORM rows and encode them once; cache hits skip both
+    body = _USER_LIST.dump_json(_USER_LIST.validate_python(result.scalars().all(), from_attributes=True))
+    _doctor_list_cache[(limit, offset)] = body
+    return Response(content=body, media_type="application/json")
+
+
+async def _authenticate(
+    session: AsyncSession,
+    email: str,
+    password: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    audit_service: BackgroundAuditService
+) -> Token:
+    """Shared login flow for the form and JSON endpoints."""
+    # Find user by email
+    result = await session.execute(select(User).where(User.email == email))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(credentials.password, user.password_hash):
+    if not user or not await run_in_threadpool(verify_password, password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -122,15 +162,15 @@ async def login_json(
             detail="Account is inactive"
         )
     
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user.id, "role": user.role.value},
-        expires_delta=access_token_expires
-    )
+    # Fresh login: make sure the next request sees the current user row
+    invalidate_user(user.id)
     
-    audit_service = get_audit_service(session)
+    # Create access token
+    access_token = create_access_token(data={"sub": user.id, "role": user.role.value})
+    
+    # Log the login after the response is sent
     client_ip = request.client.host if request.client else None
-    await audit_service.log_login(user.id, client_ip)
+    background_tasks.add_task(audit_service.log_login, user.id, client_ip)
     
     return Token(
         access_token=access_token, 
@@ -138,24 +178,3 @@ async def login_json(
         user_id=user.id,
         role=user.role
     )
-
-
-@router.get("/me", response_model=UserRead)
-async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
-):
-    """Get current logged-in user information."""
-    return current_user
-
-
-@router.get("/doctors", response_model=list[UserRead])
-async def list_doctors(
-    session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
-):
-    """List all doctors (for patients to select)."""
-    result = await session.execute(
-        select(User).where(User.role == UserRole.DOCTOR, User.is_active == True)
-    )
-    doctors = result.scalars().all()
-    return doctors
@@ -1,15 +1,18 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
 from sqlmodel import select
 
 from app.core import get_session, get_current_user
 from app.models import (
     User, UserRole,
     Appointment, AppointmentStatus,
-    Consent, ConsentCreate, ConsentRead, ConsentUpdate, ConsentStatus
+    Consent, ConsentCreate, ConsentRead, ConsentUpdate, ConsentStatus,
+    IdStr
 )
-from app.services import get_audit_service
+from app.services import BackgroundAuditService, get_background_audit_service
 
 router = APIRouter(prefix="/consent", tags=["Consent"])
 
@@ -30,7 +33,9 @@ async def create_consent_request(
     
     # Verify appointment exists
     result = await session.execute(
-        select(Appointment).where(Appointment.id == consent_data.appointment_id)
+        select(Appointment)
+        .options(raiseload("*"))
+        .where(Appointment.id == consent_data.appointment_id)
     )
     appointment = result.scalar_one_or_none()
     
@@ -47,30 +52,29 @@ async def create_consent_request(
             detail="You can only create consent for your own appointments"
         )
     
-    # Check if consent already exists
+    # Create consent request; the unique appointment_id index turns a duplicate
+    # into a no-op, so the existence check and insert are one atomic statement
     result = await session.execute(
-        select(Consent).where(Consent.appointment_id == consent_data.appointment_id)
+        pg_insert(Consent)
+        .values(
+            appointment_id=consent_data.appointment_id,
+            patient_id=appointment.patient_id,
+            status=ConsentStatus.PENDING
+        )
+        .on_conflict_do_nothing(index_elements=["appointment_id"])
+        .returning(Consent)
     )
-    existing_consent = result.scalar_one_or_none()
+    consent = result.scalar_one_or_none()
     
-    if existing_consent:
+    if not consent:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Consent request already exists for this appointment"
         )
     
-    # Create consent request
-    consent = Consent(
-        appointment_id=consent_data.appointment_id,
-        patient_id=appointment.patient_id,
-        status=ConsentStatus.PENDING
-    )
-    
-    session.add(consent)
     await session.commit()
-    await session.refresh(consent)
     
-    return ConsentRead(
+    return ConsentRead.model_construct(
         id=consent.id,
         appointment_id=consent.appointment_id,
         patient_id=consent.patient_id,
@@ -83,14 +87,16 @@ async def create_consent_request(
 
 @router.get("/{appointment_id}", response_model=ConsentRead)
 async def get_consent(
-    appointment_id: str,
+    appointment_id: IdStr,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get consent status for an appointment."""
     # Verify appointment access
     result = await session.execute(
-        select(Appointment).where(Appointment.id == appointment_id)
+        select(Appointment)
+        .options(raiseload("*"))
+        .where(Appointment.id == appointment_id)
     )
     appointment = result.scalar_one_or_none()
     
@@ -108,7 +114,9 @@ async def get_consent(
     
     # Get consent
     result = await session.execute(
-        select(Consent).where(Consent.appointment_id == appointment_id)
+        select(Consent)
+        .options(raiseload("*"))
+        .where(Consent.appointment_id == appointment_id)
     )
     consent = result.scalar_one_or_none()
     
@@ -118,7 +126,7 @@ async def get_consent(
             detail="Consent not found for this appointment"
         )
     
-    return ConsentRead(
+    return ConsentRead.model_construct(
         id=consent.id,
         appointment_id=consent.appointment_id,
         patient_id=consent.patient_id,
@@ -131,11 +139,13 @@ async def get_consent(
 
 @router.patch("/{appointment_id}", response_model=ConsentRead)
 async def update_consent(
-    appointment_id: str,
+    appointment_id: IdStr,
     update_data: ConsentUpdate,
     request: Request,
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    audit_service: BackgroundAuditService = Depends(get_background_audit_service)
 ):
     """Update consent status (patients only - grant or deny)."""
     if current_user.role != UserRole.PATIENT:
@@ -146,7 +156,9 @@ async def update_consent(
     
     # Get consent
     result = await session.execute(
-        select(Consent).where(Consent.appointment_id == appointment_id)
+        select(Consent)
+        .options(raiseload("*"))
+        .where(Consent.appointment_id == appointment_id)
     )
     consent = result.scalar_one_or_none()
     
@@ -170,19 +182,18 @@ async def update_consent(
     consent.ip_address = update_data.ip_address or (request.client.host if request.client else None)
     
     await session.commit()
-    await session.refresh(consent)
     
-    # Log the consent action
-    audit_service = get_audit_service(session)
+    # Log the consent action after the response is sent
     client_ip = request.client.host if request.client else None
-    await audit_service.log_consent(
+    background_tasks.add_task(
+        audit_service.log_consent,
         user_id=current_user.id,
         appointment_id=appointment_id,
         granted=(update_data.status == ConsentStatus.GRANTED),
         ip_address=client_ip
     )
     
-    return ConsentRead(
+    return ConsentRead.model_construct(
         id=consent.id,
         appointment_id=consent.appointment_id,
         patient_id=consent.patient_id,
@@ -195,21 +206,22 @@ async def update_consent(
 
 @router.get("/{appointment_id}/check", response_model=dict)
 async def check_consent_status(
-    appointment_id: str,
+    appointment_id: IdStr,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     """Quick check if consent is granted for recording."""
+    # Only the status is needed; skip hydrating a Consent row
     result = await session.execute(
-        select(Consent).where(Consent.appointment_id == appointment_id)
+        select(Consent.status).where(Consent.appointment_id == appointment_id)
     )
-    consent = result.scalar_one_or_none()
+    consent_status = result.scalar_one_or_none()
     
-    can_record = consent is not None and consent.status == ConsentStatus.GRANTED
+    can_record = consent_status == ConsentStatus.GRANTED
     
     return {
         "appointment_id": appointment_id,
-        "consent_exists": consent is not None,
-        "consent_status": consent.status.value if consent else None,
+        "consent_exists": consent_status is not None,
+        "consent_status": consent_status.value if consent_status else None,
         "can_record": can_record
     }
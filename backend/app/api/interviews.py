@@ -1,25 +1,75 @@
+import hashlib
+import logging
+import os
 from datetime import datetime
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File, Body
+from typing import List, NoReturn, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request, Response, UploadFile, File, Body
+from sqlalchemy import bindparam, exists, func, lambda_stmt, or_, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload
 from sqlmodel import select
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
 
 from app.core import get_session, get_current_user
+from app.core.database import async_session
 from app.models import (
     User, UserRole,
     Appointment, AppointmentStatus,
-    Interview, InterviewCreate, InterviewRead, InterviewUpdate,
+    Interview, InterviewCreate, InterviewRead, InterviewUpdate, TranscriptStatus,
     Consent, ConsentStatus,
-    AuditAction
+    AuditAction, IdStr
 )
 from app.services import (
-    get_audit_service,
-    get_storage_provider, generate_storage_key,
+    BackgroundAuditService, get_background_audit_service,
+    S3StorageProvider, get_storage_provider, generate_storage_key,
     get_transcription_service
 )
 
 router = APIRouter(prefix="/interviews", tags=["Interviews"])
+logger = logging.getLogger(__name__)
+
+# Validates and encodes list pages in one pass (see list_interviews)
+_INTERVIEW_LIST = TypeAdapter(List[InterviewRead])
+
+# Recordings are copied to storage in chunks of this size instead of whole
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Limits appointments to those the "user_id" parameter is a party to
+_PARTICIPANT = or_(
+    Appointment.doctor_id == bindparam("user_id"),
+    Appointment.patient_id == bindparam("user_id")
+)
+
+# Hot lookups as lambda statements: built and cache-keyed once here, then
+# only the bound parameters change per request
+_SELECT_APPOINTMENT = lambda_stmt(
+    lambda: select(Appointment)
+    .options(raiseload("*"))
+    .where(Appointment.id == bindparam("appointment_id"), _PARTICIPANT)
+)
+_SELECT_APPOINTMENT_WITH_INTERVIEW = lambda_stmt(
+    lambda: select(Appointment, Interview)
+    .outerjoin(Interview, Interview.appointment_id == Appointment.id)
+    .options(raiseload("*"))
+    .where(Appointment.id == bindparam("appointment_id"), _PARTICIPANT)
+)
+_SELECT_APPOINTMENT_WITH_PARTIES_AND_INTERVIEW = lambda_stmt(
+    lambda: select(Appointment, Interview)
+    .outerjoin(Interview, Interview.appointment_id == Appointment.id)
+    .options(joinedload(Appointment.doctor), joinedload(Appointment.patient), raiseload("*"))
+    .where(Appointment.id == bindparam("appointment_id"), _PARTICIPANT)
+)
+_SELECT_CONSENT_WITH_INTERVIEW = lambda_stmt(
+    lambda: select(Consent.status, Interview)
+    .outerjoin(Interview, Interview.appointment_id == Consent.appointment_id)
+    .options(raiseload("*"))
+    .where(Consent.appointment_id == bindparam("appointment_id"))
+)
+_SELECT_INTERVIEW = lambda_stmt(
+    lambda: select(Interview).where(Interview.appointment_id == bindparam("appointment_id"))
+)
 
 
 # Request models for real-time transcription
@@ -28,37 +78,44 @@ class TranscriptChunkRequest(BaseModel):
     speaker: Optional[str] = None
 
 
-@router.post("/", response_model=InterviewRead, status_code=status.HTTP_201_CREATED)
-async def create_interview(
-    interview_data: InterviewCreate,
-    request: Request,
+async def get_participant_appointment(
+    appointment_id: IdStr,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
-):
-    """Create an interview record for an appointment."""
-    # Verify appointment exists
+) -> Appointment:
+    """Path dependency: the appointment, if the current user is a party to it
+    (404 if it does not exist, 403 if it is someone else's)."""
     result = await session.execute(
-        select(Appointment).where(Appointment.id == interview_data.appointment_id)
+        _SELECT_APPOINTMENT, {"appointment_id": appointment_id, "user_id": current_user.id}
     )
     appointment = result.scalar_one_or_none()
     
     if not appointment:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Appointment not found"
-        )
-    
-    if current_user.id not in [appointment.doctor_id, appointment.patient_id]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied"
-        )
+        await _raise_missing_or_forbidden(session, Appointment.id, appointment_id)
     
-    # Check if interview already exists
-    result = await session.execute(
-        select(Interview).where(Interview.appointment_id == interview_data.appointment_id)
+    return appointment
+
+
+@router.post("/", response_model=InterviewRead, status_code=status.HTTP_201_CREATED)
+async def create_interview(
+    interview_data: InterviewCreate,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    audit_service: BackgroundAuditService = Depends(get_background_audit_service)
+):
+    """Create an interview record for an appointment."""
+    # Access check and duplicate check in one query: no row means the
+    # appointment is missing or not the user's, otherwise a boolean
+    existing = await session.scalar(
+        select(exists().where(Interview.appointment_id == Appointment.id))
+        .where(Appointment.id == interview_data.appointment_id, _PARTICIPANT),
+        {"user_id": current_user.id}
     )
-    existing = result.scalar_one_or_none()
+    
+    if existing is None:
+        await _raise_missing_or_forbidden(session, Appointment.id, interview_data.appointment_id)
     
     if existing:
         raise HTTPException(
@@ -74,47 +131,23 @@ async def create_interview(
     
     session.add(interview)
     await session.commit()
-    await session.refresh(interview)
     
     # Log
-    audit_service = get_audit_service(session)
     client_ip = request.client.host if request.client else None
-    await audit_service.log_interview_join(current_user.id, interview_data.appointment_id, client_ip)
+    background_tasks.add_task(audit_service.log_interview_join, current_user.id, interview_data.appointment_id, client_ip)
     
-    return _interview_to_read(interview)
+    return InterviewRead.model_validate(interview)
 
 
 @router.get("/{appointment_id}", response_model=InterviewRead)
 async def get_interview(
-    appointment_id: str,
+    appointment_id: IdStr,
     request: Request,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     """Get interview details for an appointment."""
-    # Verify appointment access
-    result = await session.execute(
-        select(Appointment).where(Appointment.id == appointment_id)
-    )
-    appointment = result.scalar_one_or_none()
-    
-    if not appointment:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Appointment not found"
-        )
-    
-    if current_user.id not in [appointment.doctor_id, appointment.patient_id]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied"
-        )
-    
-    # Get interview
-    result = await session.execute(
-        select(Interview).where(Interview.appointment_id == appointment_id)
-    )
-    interview = result.scalar_one_or_none()
+    appointment, interview = await _load_appointment_with_interview(session, appointment_id, current_user)
     
     if not interview:
         raise HTTPException(
@@ -122,7 +155,7 @@ async def get_interview(
             detail="Interview not found"
         )
     
-    return _interview_to_read(interview)
+    return InterviewRead.model_validate(interview)
 
 
 @router.get("/", response_model=List[InterviewRead])
@@ -131,50 +164,43 @@ async def list_interviews(
     current_user: User = Depends(get_current_user)
 ):
     """List all interviews for current user."""
-    # Get user's appointments first
+    # Join through the user's appointments instead of collecting their ids first
     if current_user.role == UserRole.DOCTOR:
-        appointment_query = select(Appointment.id).where(Appointment.doctor_id == current_user.id)
+        participant_filter = Appointment.doctor_id == current_user.id
     else:
-        appointment_query = select(Appointment.id).where(Appointment.patient_id == current_user.id)
-    
-    result = await session.execute(appointment_query)
-    appointment_ids = [row[0] for row in result.fetchall()]
+        participant_filter = Appointment.patient_id == current_user.id
     
-    # Get interviews for those appointments
     result = await session.execute(
-        select(Interview).where(Interview.appointment_id.in_(appointment_ids))
+        select(Interview)
+        .join(Appointment, Appointment.id == Interview.appointment_id)
+        .options(raiseload("*"))
+        .where(participant_filter)
     )
-    interviews = result.scalars().all()
     
-    return [_interview_to_read(i) for i in interviews]
+    interviews = _INTERVIEW_LIST.validate_python(result.scalars().all(), from_attributes=True)
+    return Response(content=_INTERVIEW_LIST.dump_json(interviews), media_type="application/json")
 
 
 @router.post("/{appointment_id}/start-recording", response_model=dict)
 async def start_recording(
-    appointment_id: str,
+    appointment_id: IdStr,
     request: Request,
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    audit_service: BackgroundAuditService = Depends(get_background_audit_service)
 ):
     """Start recording an interview (requires consent)."""
-    # Verify consent is granted
-    result = await session.execute(
-        select(Consent).where(Consent.appointment_id == appointment_id)
-    )
-    consent = result.scalar_one_or_none()
+    consent_status, interview = await _load_consent_with_interview(session, appointment_id)
     
-    if not consent or consent.status != ConsentStatus.GRANTED:
+    # Verify consent is granted
+    if consent_status != ConsentStatus.GRANTED:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Recording requires patient consent"
         )
     
     # Get or create interview
-    result = await session.execute(
-        select(Interview).where(Interview.appointment_id == appointment_id)
-    )
-    interview = result.scalar_one_or_none()
-    
     if not interview:
         interview = Interview(
             appointment_id=appointment_id,
@@ -182,12 +208,10 @@ async def start_recording(
         )
         session.add(interview)
         await session.commit()
-        await session.refresh(interview)
     
     # Log recording start
-    audit_service = get_audit_service(session)
     client_ip = request.client.host if request.client else None
-    await audit_service.log_recording_start(current_user.id, interview.id, client_ip)
+    background_tasks.add_task(audit_service.log_recording_start, current_user.id, interview.id, client_ip)
     
     return {
         "status": "recording_started",
@@ -198,15 +222,15 @@ async def start_recording(
 
 @router.post("/{appointment_id}/stop-recording", response_model=InterviewRead)
 async def stop_recording(
-    appointment_id: str,
+    appointment_id: IdStr,
     request: Request,
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    audit_service: BackgroundAuditService = Depends(get_background_audit_service)
 ):
     """Stop recording and finalize interview."""
-    result = await session.execute(
-        select(Interview).where(Interview.appointment_id == appointment_id)
-    )
+    result = await session.execute(_SELECT_INTERVIEW, {"appointment_id": appointment_id})
     interview = result.scalar_one_or_none()
     
     if not interview:
@@ -220,43 +244,33 @@ async def stop_recording(
         interview.duration_seconds = int((interview.ended_at - interview.started_at).total_seconds())
     
     await session.commit()
-    await session.refresh(interview)
     
     # Log recording stop
-    audit_service = get_audit_service(session)
     client_ip = request.client.host if request.client else None
-    await audit_service.log_recording_stop(current_user.id, interview.id, client_ip)
+    background_tasks.add_task(audit_service.log_recording_stop, current_user.id, interview.id, client_ip)
     
-    return _interview_to_read(interview)
+    return InterviewRead.model_validate(interview)
 
 
 @router.post("/{appointment_id}/upload-recording", response_model=InterviewRead)
 async def upload_recording(
-    appointment_id: str,
+    appointment_id: IdStr,
     request: Request,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     """Upload a recording file for an interview."""
-    # Verify consent
-    result = await session.execute(
-        select(Consent).where(Consent.appointment_id == appointment_id)
-    )
-    consent = result.scalar_one_or_none()
+    consent_status, interview = await _load_consent_with_interview(session, appointment_id)
     
-    if not consent or consent.status != ConsentStatus.GRANTED:
+    # Verify consent
+    if consent_status != ConsentStatus.GRANTED:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Recording upload requires patient consent"
         )
     
-    # Get interview
-    result = await session.execute(
-        select(Interview).where(Interview.appointment_id == appointment_id)
-    )
-    interview = result.scalar_one_or_none()
-    
     if not interview:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -265,7 +279,8 @@ async def upload_recording(
     
     # Save recording
     storage = get_storage_provider()
-    file_extension = file.filename.split(".")[-1] if file.filename else "webm"
+    # Lower-cased and bounded so one format maps to one key suffix
+    file_extension = (os.path.splitext(file.filename or "")[1].lstrip(".") or "webm").lower()[:8]
     storage_key = generate_storage_key(
         "recordings",
         interview.id,
@@ -273,73 +288,39 @@ async def upload_recording(
         file_extension
     )
     
-    content = await file.read()
-    await storage.save(content, storage_key)
+    await storage.save_stream(_iter_upload(file), storage_key)
     
     interview.recording_path = storage_key
+    interview.transcript_status = TranscriptStatus.PENDING
     interview.ended_at = datetime.utcnow()
     if interview.started_at:
         interview.duration_seconds = int((interview.ended_at - interview.started_at).total_seconds())
     
     await session.commit()
-    await session.refresh(interview)
     
-    # Start transcription
-    transcription_service = get_transcription_service()
-    transcript = await transcription_service.transcribe_video(
+    # Transcribe after the response is sent; GET /{appointment_id}/transcript
+    # reports transcript_status "pending" until the job finishes or fails
+    background_tasks.add_task(
+        _transcribe_recording,
+        interview.id,
         storage._get_full_path(storage_key) if hasattr(storage, '_get_full_path') else storage_key
     )
     
-    if transcript:
-        # Save transcript
-        transcript_key = generate_storage_key(
-            "transcripts",
-            interview.id,
-            "transcript",
-            "txt"
-        )
-        await storage.save(transcript.encode(), transcript_key)
-        
-        interview.transcript_path = transcript_key
-        interview.transcript_text = transcript
-        
-        await session.commit()
-        await session.refresh(interview)
-    
-    return _interview_to_read(interview)
+    return InterviewRead.model_validate(interview)
 
 
 @router.get("/{appointment_id}/transcript", response_model=dict)
 async def get_transcript(
-    appointment_id: str,
+    appointment_id: IdStr,
     request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    audit_service: BackgroundAuditService = Depends(get_background_audit_service)
 ):
-    """Get the transcript for an interview."""
-    # Verify access
-    result = await session.execute(
-        select(Appointment).where(Appointment.id == appointment_id)
-    )
-    appointment = result.scalar_one_or_none()
-    
-    if not appointment:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Appointment not found"
-        )
-    
-    if current_user.id not in [appointment.doctor_id, appointment.patient_id]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied"
-        )
-    
-    # Get interview
-    result = await session.execute(
-        select(Interview).where(Interview.appointment_id == appointment_id)
-    )
-    interview = result.scalar_one_or_none()
+    """Get the transcript for an interview (honours If-None-Match)."""
+    appointment, interview = await _load_appointment_with_interview(session, appointment_id, current_user)
     
     if not interview:
         raise HTTPException(
@@ -348,9 +329,9 @@ async def get_transcript(
         )
     
     # Log transcript view
-    audit_service = get_audit_service(session)
     client_ip = request.client.host if request.client else None
-    await audit_service.log(
+    background_tasks.add_task(
+        audit_service.log,
         user_id=current_user.id,
         action=AuditAction.VIEW_TRANSCRIPT,
         resource_type="interview",
@@ -358,34 +339,105 @@ async def get_transcript(
         ip_address=client_ip
     )
     
+    etag = _content_etag(
+        interview.id, interview.transcript_text, interview.transcript_path, interview.transcript_status
+    )
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
     return {
         "interview_id": interview.id,
         "appointment_id": appointment_id,
         "transcript": interview.transcript_text,
-        "transcript_path": interview.transcript_path
+        "transcript_path": interview.transcript_path,
+        "transcript_status": interview.transcript_status
     }
 
 
-# Real-time transcription endpoints
-@router.post("/{appointment_id}/realtime/start", response_model=dict)
-async def start_realtime_transcription(
-    appointment_id: str,
+@router.get("/{appointment_id}/transcript/metadata", response_model=dict)
+async def get_transcript_metadata(
+    appointment_id: IdStr,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Start real-time transcription session."""
-    # Verify access
-    result = await session.execute(
-        select(Appointment).where(Appointment.id == appointment_id)
+    """Get transcript size, ETag and download location without the text itself."""
+    interview_id, transcript_path, length, digest = await _load_transcript_ref(
+        session, appointment_id, current_user
     )
-    appointment = result.scalar_one_or_none()
     
-    if not appointment:
-        raise HTTPException(status_code=404, detail="Appointment not found")
+    # With S3 the client can fetch the object straight from the bucket
+    download_url = None
+    storage = get_storage_provider()
+    if transcript_path:
+        # /transcript/content serves the stored file, so report its size
+        length = await storage.get_size(transcript_path)
+        if isinstance(storage, S3StorageProvider):
+            download_url = await run_in_threadpool(storage.get_url, transcript_path)
     
-    if current_user.id not in [appointment.doctor_id, appointment.patient_id]:
-        raise HTTPException(status_code=403, detail="Access denied")
+    return {
+        "interview_id": interview_id,
+        "appointment_id": appointment_id,
+        "length": length or 0,
+        "etag": _content_etag(interview_id, digest, transcript_path),
+        "content_url": f"/api/interviews/{appointment_id}/transcript/content",
+        "download_url": download_url
+    }
+
+
+@router.get("/{appointment_id}/transcript/content")
+async def get_transcript_content(
+    appointment_id: IdStr,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+    audit_service: BackgroundAuditService = Depends(get_background_audit_service)
+):
+    """Stream the transcript as plain text (honours If-None-Match)."""
+    interview_id, transcript_path, length, digest = await _load_transcript_ref(
+        session, appointment_id, current_user
+    )
+    
+    if not length and not transcript_path:
+        raise HTTPException(status_code=404, detail="No transcript available")
+    
+    # Log transcript view
+    client_ip = request.client.host if request.client else None
+    background_tasks.add_task(
+        audit_service.log,
+        user_id=current_user.id,
+        action=AuditAction.VIEW_TRANSCRIPT,
+        resource_type="interview",
+        resource_id=interview_id,
+        ip_address=client_ip
+    )
+    
+    etag = _content_etag(interview_id, digest, transcript_path)
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    if not transcript_path:
+        # Real-time transcripts only live in the database
+        transcript_text = await session.scalar(
+            select(Interview.transcript_text).where(Interview.id == interview_id)
+        )
+        return Response(content=transcript_text, media_type="text/plain", headers={"ETag": etag})
     
+    return StreamingResponse(
+        get_storage_provider().open_stream(transcript_path),
+        media_type="text/plain",
+        headers={"ETag": etag}
+    )
+
+
+# Real-time transcription endpoints
+@router.post("/{appointment_id}/realtime/start", response_model=dict)
+async def start_realtime_transcription(
+    appointment_id: IdStr,
+    appointment: Appointment = Depends(get_participant_appointment)
+):
+    """Start real-time transcription session."""
     transcription_service = get_transcription_service()
     transcription_service.start_realtime_session(appointment_id)
     
@@ -398,30 +450,12 @@ async def start_realtime_transcription(
 
 @router.post("/{appointment_id}/realtime/chunk", response_model=dict)
 async def add_transcript_chunk(
-    appointment_id: str,
+    appointment_id: IdStr,
     chunk_data: TranscriptChunkRequest,
-    session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    appointment: Appointment = Depends(get_participant_appointment)
 ):
     """Add a chunk of transcribed text in real-time."""
-    # Verify appointment exists and user has access
-    result = await session.execute(
-        select(Appointment).where(Appointment.id == appointment_id)
-    )
-    appointment = result.scalar_one_or_none()
-    
-    if not appointment:
-        raise HTTPException(
-             status_code=status.HTTP_404_NOT_FOUND,
-             detail="Appointment not found"
-        )
-
-    if current_user.id not in [appointment.doctor_id, appointment.patient_id]:
-         raise HTTPException(
-             status_code=status.HTTP_403_FORBIDDEN,
-             detail="Access denied"
-         )
-
     transcription_service = get_transcription_service()
     
     # Determine speaker based on role
@@ -439,13 +473,20 @@ async def add_transcript_chunk(
 
 @router.get("/{appointment_id}/realtime/transcript", response_model=dict)
 async def get_realtime_transcript(
-    appointment_id: str,
-    session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    appointment_id: IdStr,
+    request: Request,
+    response: Response,
+    appointment: Appointment = Depends(get_participant_appointment)
 ):
-    """Get the current real-time transcript."""
+    """Get the current real-time transcript (honours If-None-Match)."""
     transcription_service = get_transcription_service()
     
+    # Versioned per added chunk, so polling an unchanged transcript is free
+    etag = f'"rt-{transcription_service.get_realtime_version(appointment_id)}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
     return {
         "appointment_id": appointment_id,
         "transcript": transcription_service.get_realtime_transcript(appointment_id)
@@ -454,18 +495,16 @@ async def get_realtime_transcript(
 
 @router.post("/{appointment_id}/realtime/end", response_model=dict)
 async def end_realtime_transcription(
-    appointment_id: str,
+    appointment_id: IdStr,
     session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    appointment: Appointment = Depends(get_participant_appointment)
 ):
     """End real-time transcription and save to interview."""
     transcription_service = get_transcription_service()
     final_transcript = transcription_service.end_realtime_session(appointment_id)
     
     # Save to interview record
-    result = await session.execute(
-        select(Interview).where(Interview.appointment_id == appointment_id)
-    )
+    result = await session.execute(_SELECT_INTERVIEW, {"appointment_id": appointment_id})
     interview = result.scalar_one_or_none()
     
     if interview:
@@ -482,7 +521,7 @@ async def end_realtime_transcription(
 # Summary endpoint
 @router.post("/{appointment_id}/generate-summary", response_model=dict)
 async def generate_interview_summary(
-    appointment_id: str,
+    appointment_id: IdStr,
     request: Request,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
@@ -495,27 +534,13 @@ async def generate_interview_summary(
             detail="Only doctors can generate summaries"
         )
     
-    # Get appointment with relationships
-    result = await session.execute(
-        select(Appointment).where(Appointment.id == appointment_id)
+    # Get appointment, doctor, patient and interview in one round-trip
+    appointment, interview = await _load_appointment_with_interview(
+        session, appointment_id, current_user, with_parties=True
     )
-    appointment = result.scalar_one_or_none()
     
-    if not appointment:
-        raise HTTPException(status_code=404, detail="Appointment not found")
-    
-    # Get doctor and patient names
-    result = await session.execute(select(User).where(User.id == appointment.doctor_id))
-    doctor = result.scalar_one_or_none()
-    
-    result = await session.execute(select(User).where(User.id == appointment.patient_id))
-    patient = result.scalar_one_or_none()
-    
-    # Get interview
-    result = await session.execute(
-        select(Interview).where(Interview.appointment_id == appointment_id)
-    )
-    interview = result.scalar_one_or_none()
+    doctor = appointment.doctor
+    patient = appointment.patient
     
     if not interview:
         raise HTTPException(status_code=404, detail="Interview not found")
@@ -536,7 +561,6 @@ async def generate_interview_summary(
     interview.key_points = summary_data["key_points"]
     
     await session.commit()
-    await session.refresh(interview)
     
     return {
         "interview_id": interview.id,
@@ -550,32 +574,26 @@ async def generate_interview_summary(
 
 @router.get("/{appointment_id}/summary", response_model=dict)
 async def get_interview_summary(
-    appointment_id: str,
+    appointment_id: IdStr,
+    request: Request,
+    response: Response,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Get the summary for an interview."""
-    # Verify access
-    result = await session.execute(
-        select(Appointment).where(Appointment.id == appointment_id)
-    )
-    appointment = result.scalar_one_or_none()
-    
-    if not appointment:
-        raise HTTPException(status_code=404, detail="Appointment not found")
-    
-    if current_user.id not in [appointment.doctor_id, appointment.patient_id]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    # Get interview
-    result = await session.execute(
-        select(Interview).where(Interview.appointment_id == appointment_id)
-    )
-    interview = result.scalar_one_or_none()
+    """Get the summary for an interview (honours If-None-Match)."""
+    appointment, interview = await _load_appointment_with_interview(session, appointment_id, current_user)
     
     if not interview:
         raise HTTPException(status_code=404, detail="Interview not found")
     
+    etag = _content_etag(
+        interview.id, appointment.meeting_number, interview.summary_text,
+        interview.key_points, interview.transcript_text, interview.duration_seconds
+    )
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
     return {
         "interview_id": interview.id,
         "appointment_id": appointment_id,
@@ -591,35 +609,28 @@ async def get_interview_summary(
 
 @router.post("/{interview_id}/summarize")
 async def summarize_interview(
-    interview_id: str,
+    interview_id: IdStr,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
     """Generate AI summary from interview transcript."""
     from app.services.summarization import get_summarization_service
     
-    # Get interview
+    # Get interview, only if the user is a party to its appointment
     result = await session.execute(
-        select(Interview).where(Interview.id == interview_id)
+        select(Interview)
+        .join(Appointment, Appointment.id == Interview.appointment_id)
+        .options(raiseload("*"))
+        .where(Interview.id == interview_id, _PARTICIPANT),
+        {"user_id": current_user.id}
     )
     interview = result.scalar_one_or_none()
     
     if not interview:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Interview not found"
-        )
-    
-    # Verify user has access (doctor or patient from the appointment)
-    appt_result = await session.execute(
-        select(Appointment).where(Appointment.id == interview.appointment_id)
-    )
-    appointment = appt_result.scalar_one_or_none()
-    
-    if not appointment or (current_user.id != appointment.patient_id and current_user.id != appointment.doctor_id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access this interview"
+        await _raise_missing_or_forbidden(
+            session, Interview.id, interview_id,
+            not_found="Interview not found",
+            forbidden="Not authorized to access this interview"
         )
     
     # Check if transcript exists (from real-time transcription)
@@ -641,7 +652,6 @@ async def summarize_interview(
         interview.summarized_at = datetime.utcnow()
         
         await session.commit()
-        await session.refresh(interview)
         
         return {
             "interview_id": interview.id,
@@ -660,7 +670,7 @@ async def summarize_interview(
 
 @router.get("/{interview_id}/messages")
 async def get_interview_messages(
-    interview_id: str,
+    interview_id: IdStr,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
@@ -668,63 +678,177 @@ async def get_interview_messages(
     from app.models.models import ChatMessage
     
     # Verify interview exists and user has access
-    result = await session.execute(
-        select(Interview).where(Interview.id == interview_id)
-    )
-    interview = result.scalar_one_or_none()
-    
-    if not interview:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Interview not found"
-        )
-    
-    # Verify access
-    appt_result = await session.execute(
-        select(Appointment).where(Appointment.id == interview.appointment_id)
+    has_access = await session.scalar(
+        select(
+            exists()
+            .where(Interview.id == interview_id)
+            .where(Appointment.id == Interview.appointment_id)
+            .where(_PARTICIPANT)
+        ),
+        {"user_id": current_user.id}
     )
-    appointment = appt_result.scalar_one_or_none()
     
-    if not appointment or (current_user.id != appointment.patient_id and current_user.id != appointment.doctor_id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access these messages"
+    if not has_access:
+        await _raise_missing_or_forbidden(
+            session, Interview.id, interview_id,
+            not_found="Interview not found",
+            forbidden="Not authorized to access these messages"
         )
     
-    # Get messages
-    # Get messages with sender information
+    # Get messages with the sender's role; plain columns, so no ChatMessage or
+    # User entities (password hashes included) are built per row
     messages_result = await session.execute(
-        select(ChatMessage, User)
+        select(
+            ChatMessage.id, ChatMessage.sender_id, ChatMessage.message, ChatMessage.created_at,
+            User.role
+        )
         .join(User, ChatMessage.sender_id == User.id)
         .where(ChatMessage.interview_id == interview_id)
         .order_by(ChatMessage.created_at)
     )
-    messages_with_users = messages_result.all()
     
     return {"messages": [
         {
-            "id": msg.id,
-            "sender_id": msg.sender_id,
-            "sender_role": user.role.value if user.role else "unknown",
-            "message": msg.message,
-            "created_at": msg.created_at.isoformat()
+            "id": row.id,
+            "sender_id": row.sender_id,
+            "sender_role": row.role.value if row.role else "unknown",
+            "message": row.message,
+            "created_at": row.created_at.isoformat()
         }
-        for msg, user in messages_with_users
+        for row in messages_result
     ]}
 
 
-def _interview_to_read(interview: Interview) -> InterviewRead:
-    return InterviewRead(
-        id=interview.id,
-        appointment_id=interview.appointment_id,
-        recording_path=interview.recording_path,
-        transcript_path=interview.transcript_path,
-        transcript_text=interview.transcript_text,
-        summary_text=interview.summary_text,
-        key_points=interview.key_points,
-        duration_seconds=interview.duration_seconds,
-        started_at=interview.started_at,
-        ended_at=interview.ended_at,
-        created_at=interview.created_at
+async def _raise_missing_or_forbidden(
+    session: AsyncSession,
+    id_column,
+    row_id: str,
+    not_found: str = "Appointment not found",
+    forbidden: str = "Access denied"
+) -> NoReturn:
+    """A fused _PARTICIPANT lookup matched nothing: 404 if the row does not
+    exist, else 403. Only runs on that failure path."""
+    found = await session.scalar(select(id_column).where(id_column == row_id))
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=forbidden)
+
+
+async def _load_appointment_with_interview(
+    session: AsyncSession, appointment_id: str, current_user: User, with_parties: bool = False
+):
+    """Fetch the user's appointment and its interview (None if not created yet) in one query.
+    
+    Membership is filtered in the same query as the fetch; on a miss, raises
+    404 if the appointment does not exist, else 403. With
+    with_parties, appointment.doctor and appointment.patient are loaded too.
+    """
+    stmt = _SELECT_APPOINTMENT_WITH_PARTIES_AND_INTERVIEW if with_parties else _SELECT_APPOINTMENT_WITH_INTERVIEW
+    result = await session.execute(
+        stmt, {"appointment_id": appointment_id, "user_id": current_user.id}
+    )
+    row = result.one_or_none()
+    if not row:
+        await _raise_missing_or_forbidden(session, Appointment.id, appointment_id)
+    return row[0], row[1]
+
+
+async def _load_transcript_ref(session: AsyncSession, appointment_id: str, current_user: User):
+    """Fetch (interview_id, transcript_path, text size in bytes, text md5) for the user's appointment.
+    
+    Size and digest are computed in the database so the text itself is
+    not loaded. Raises 404 if the appointment or interview is missing, 403
+    if the appointment is someone else's.
+    """
+    result = await session.execute(
+        select(
+            Appointment.id,
+            Interview.id,
+            Interview.transcript_path,
+            func.octet_length(Interview.transcript_text),
+            func.md5(Interview.transcript_text)
+        )
+        .outerjoin(Interview, Interview.appointment_id == Appointment.id)
+        .where(Appointment.id == appointment_id, _PARTICIPANT),
+        {"user_id": current_user.id}
     )
+    row = result.one_or_none()
+    if not row:
+        await _raise_missing_or_forbidden(session, Appointment.id, appointment_id)
+    if not row[1]:
+        raise HTTPException(status_code=404, detail="Interview not found")
+    return row[1], row[2], row[3], row[4]
+
+
+async def _load_consent_with_interview(session: AsyncSession, appointment_id: str):
+    """Fetch an appointment's consent status and interview in one query.
+    
+    Returns (None, None) when no consent exists, since there is then nothing
+    the recording endpoints can do with the interview anyway.
+    """
+    result = await session.execute(_SELECT_CONSENT_WITH_INTERVIEW, {"appointment_id": appointment_id})
+    row = result.one_or_none()
+    return (row[0], row[1]) if row else (None, None)
+
+
+async def _iter_upload(file: UploadFile):
+    """Yield an uploaded file in UPLOAD_CHUNK_SIZE pieces."""
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+async def _transcribe_recording(interview_id: str, recording_path: str):
+    """Background job: transcribe an uploaded recording and store the result.
+    
+    Runs after the upload response, so it uses its own session. Leaves
+    transcript_status at DONE or FAILED so clients can stop polling.
+    """
+    transcription_service = get_transcription_service()
+    values = {"transcript_status": TranscriptStatus.FAILED}
+    try:
+        transcript = await transcription_service.transcribe_video(recording_path)
+        if transcript:
+            # Save transcript
+            storage = get_storage_provider()
+            transcript_key = generate_storage_key(
+                "transcripts",
+                interview_id,
+                "transcript",
+                "txt"
+            )
+            await storage.save(transcript.encode(), transcript_key)
+            values = {
+                "transcript_status": TranscriptStatus.DONE,
+                "transcript_path": transcript_key,
+                "transcript_text": transcript
+            }
+        else:
+            logger.warning("Transcription of interview %s returned no text", interview_id)
+    except Exception:
+        logger.exception("Failed to transcribe recording for interview %s", interview_id)
+    
+    async with async_session() as session:
+        await session.execute(
+            update(Interview)
+            .where(Interview.id == interview_id)
+            .values(**values)
+        )
+        await session.commit()
+
+
+def _content_etag(*parts) -> str:
+    """Strong ETag over the fields a response is built from."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(repr(part).encode())
+        digest.update(b"\x1f")
+    return f'"{digest.hexdigest()}"'
+
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match already covers this ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
@@ -1,13 +1,14 @@
 from datetime import timedelta
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlmodel import select
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
 from app.core import get_session, get_current_user
-from app.models import User, Notification, NotificationType, Appointment, AppointmentStatus
+from app.models import User, Notification, NotificationType, Appointment, AppointmentStatus, IdStr
 from app.services.notification import NotificationService
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
@@ -25,8 +26,11 @@ class NotificationRead(BaseModel):
         from_attributes = True
 
 
+_NOTIFICATION_LIST = TypeAdapter(List[NotificationRead])
+
+
 class PatientWaitingRequest(BaseModel):
-    appointment_id: str
+    appointment_id: IdStr
     waiting_minutes: int = 5
 
 
@@ -39,27 +43,26 @@ async def get_my_notifications(
 ):
     """Get notifications for the current user."""
     service = NotificationService(session)
-    notifications = await service.get_user_notifications(current_user.id, limit)
+    notifications = await service.get_user_notifications(current_user.id, limit, unread_only)
     
-    result = []
-    for notif in notifications:
-        if unread_only and notif.read:
-            continue
-        result.append(NotificationRead(
+    result = [
+        NotificationRead.model_construct(
             id=notif.id,
             type=notif.type.value,
             message=notif.message,
             sent_at=notif.sent_at.isoformat(),
             read=notif.read,
             appointment_id=notif.appointment_id
-        ))
+        )
+        for notif in notifications
+    ]
     
-    return result
+    return Response(content=_NOTIFICATION_LIST.dump_json(result), media_type="application/json")
 
 
 @router.patch("/{notification_id}/read")
 async def mark_notification_read(
-    notification_id: str,
+    notification_id: IdStr,
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user)
 ):
@@ -82,19 +85,19 @@ async def mark_all_notifications_read(
     current_user: User = Depends(get_current_user)
 ):
     """Mark all notifications as read for the current user."""
-    stmt = select(Notification).where(
-        Notification.user_id == current_user.id,
-        Notification.read == False
+    stmt = (
+        update(Notification)
+        .where(
+            Notification.user_id == current_user.id,
+            Notification.read == False
+        )
+        .values(read=True)
+        .execution_options(synchronize_session=False)
     )
     result = await session.execute(stmt)
-    notifications = result.scalars().all()
-    
-    for notif in notifications:
-        notif.read = True
-    
     await session.commit()
     
-    return {"message": f"Marked {len(notifications)} notifications as read"}
+    return {"message": f"Marked {result.rowcount} notifications as read"}
 
 
 @router.get("/unread-count")
@@ -103,14 +106,13 @@ async def get_unread_count(
     current_user: User = Depends(get_current_user)
 ):
     """Get count of unread notifications."""
-    stmt = select(Notification).where(
+    stmt = select(func.count(Notification.id)).where(
         Notification.user_id == current_user.id,
         Notification.read == False
     )
     result = await session.execute(stmt)
-    notifications = result.scalars().all()
     
-    return {"unread_count": len(notifications)}
+    return {"unread_count": result.scalar_one()}
 
 
 @router.post("/check-reminders")
@@ -1,96 +1,288 @@
-import json
-from typing import Dict, Set
+import asyncio
+import logging
+import orjson
+from typing import Dict, Optional, Tuple
 from datetime import datetime
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
+from uuid import uuid4
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
-from app.core import get_session, decode_token
+from app.core import get_session, get_settings, decode_token
 from app.models import User, Appointment
 
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
 router = APIRouter(tags=["WebRTC Signaling"])
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Frames buffered per socket before the oldest are dropped
+SEND_QUEUE_SIZE = 64
+
+
+def _dumps(message: dict) -> str:
+    return orjson.dumps(message).decode()
+
+
+# Fixed-content frames, serialized once at import. Frames stay text (not
+# bytes): the browser client JSON.parses event.data as a string.
+PONG_PAYLOAD = _dumps({"type": "pong"})
 
 
 class ConnectionManager:
     """Manages WebSocket connections for WebRTC signaling."""
     
     def __init__(self):
-        # room_id -> set of websocket connections
-        self.rooms: Dict[str, Set[WebSocket]] = {}
+        # room_id -> {websocket: user info}, in join order; members carry
+        # their info so room walks never go back through self.connections
+        self.rooms: Dict[str, Dict[WebSocket, dict]] = {}
+        # room_id -> {user_id: websocket}, for point-to-point SDP/ICE relays
+        self.room_users: Dict[str, Dict[str, WebSocket]] = {}
         # websocket -> user info
         self.connections: Dict[WebSocket, dict] = {}
+        # websocket -> (outgoing frame queue, writer task draining it)
+        self.outboxes: Dict[WebSocket, Tuple[asyncio.Queue, asyncio.Task]] = {}
+        # room_id -> (serialized participants list, count); dropped on join/leave
+        self._participants_payloads: Dict[str, Tuple[str, int]] = {}
     
     async def connect(self, websocket: WebSocket, room_id: str, user_id: str, user_role: str):
         await websocket.accept()
         
-        if room_id not in self.rooms:
-            self.rooms[room_id] = set()
-        
-        self.rooms[room_id].add(websocket)
-        self.connections[websocket] = {
+        info = {
             "room_id": room_id,
             "user_id": user_id,
             "user_role": user_role
         }
+        self.rooms.setdefault(room_id, {})[websocket] = info
+        # A user reconnecting (or in a second tab) takes over their slot
+        self.room_users.setdefault(room_id, {})[user_id] = websocket
+        self.connections[websocket] = info
+        self._participants_payloads.pop(room_id, None)
+        
+        queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.outboxes[websocket] = (queue, asyncio.create_task(self._writer(websocket, queue)))
         
         # Notify others in room
         await self.broadcast_to_room(room_id, {
             "type": "user-joined",
             "user_id": user_id,
             "user_role": user_role,
-            "participants": len(self.rooms[room_id])
+            "participants": (await self.get_participants_payload(room_id))[1]
         }, exclude=websocket)
     
-    def disconnect(self, websocket: WebSocket):
+    async def disconnect(self, websocket: WebSocket):
         if websocket in self.connections:
             info = self.connections[websocket]
             room_id = info["room_id"]
+            self._participants_payloads.pop(room_id, None)
             
-            if room_id in self.rooms:
-                self.rooms[room_id].discard(websocket)
-                if not self.rooms[room_id]:
+            room = self.rooms.get(room_id)
+            if room is not None:
+                room.pop(websocket, None)
+                if not room:
                     del self.rooms[room_id]
             
+            users = self.room_users.get(room_id)
+            if users is not None:
+                if users.get(info["user_id"]) is websocket:
+                    # Fall back to another of this user's sockets, if any
+                    other = next((c for c, i in (room or {}).items() if i["user_id"] == info["user_id"]), None)
+                    if other is not None:
+                        users[info["user_id"]] = other
+                    else:
+                        del users[info["user_id"]]
+                if not users:
+                    del self.room_users[room_id]
+            
             del self.connections[websocket]
+            
+            outbox = self.outboxes.pop(websocket, None)
+            if outbox:
+                outbox[1].cancel()
             return info
         return None
     
+    def send(self, websocket: WebSocket, message: dict):
+        """Queue a message for one socket."""
+        self.send_text(websocket, _dumps(message))
+    
     async def broadcast_to_room(self, room_id: str, message: dict, exclude: WebSocket = None):
         if room_id in self.rooms:
-            # Create a copy to avoid 'Set changed size during iteration' error
-            connections = list(self.rooms[room_id])
-            for connection in connections:
-                if connection != exclude:
-                    try:
-                        await connection.send_json(message)
-                    except Exception:
-                        pass
+            # Serialize once for the whole room
+            self._deliver_to_room(room_id, _dumps(message), exclude)
     
     async def send_to_user(self, room_id: str, target_user_id: str, message: dict):
-        if room_id in self.rooms:
-            # Create a copy to avoid 'Set changed size during iteration' error
-            connections = list(self.rooms[room_id])
-            for connection in connections:
-                if connection in self.connections:
-                    if self.connections[connection]["user_id"] == target_user_id:
-                        try:
-                            await connection.send_json(message)
-                        except Exception:
-                            pass
-                        break
-    
-    def get_room_participants(self, room_id: str) -> list:
-        participants = []
-        if room_id in self.rooms:
-            # Create a copy to avoid 'Set changed size during iteration' error
-            connections = list(self.rooms[room_id])
-            for connection in connections:
-                if connection in self.connections:
-                    participants.append(self.connections[connection])
-        return participants
+        self._deliver_to_user(room_id, target_user_id, _dumps(message))
+    
+    async def get_room_participants(self, room_id: str) -> list:
+        return list(self.rooms.get(room_id, {}).values())
+    
+    async def get_participants_payload(self, room_id: str) -> Tuple[str, int]:
+        """Serialized participants list and its length, cached until membership changes."""
+        cached = self._participants_payloads.get(room_id)
+        if cached is None:
+            participants = await self.get_room_participants(room_id)
+            cached = (_dumps(participants), len(participants))
+            if room_id in self.rooms:
+                self._participants_payloads[room_id] = cached
+        return cached
+    
+    async def close(self):
+        pass
+    
+    def _deliver_to_room(self, room_id: str, payload: str, exclude: Optional[WebSocket] = None):
+        # Each member's writer task does the actual send, so a slow client
+        # only delays itself
+        for connection in self.rooms.get(room_id, ()):
+            if connection is not exclude:
+                self.send_text(connection, payload)
+    
+    def _deliver_to_user(self, room_id: str, target_user_id: str, payload: str) -> bool:
+        target = self.room_users.get(room_id, {}).get(target_user_id)
+        if target is None:
+            return False
+        self.send_text(target, payload)
+        return True
+    
+    def send_text(self, websocket: WebSocket, payload: str):
+        """Queue an already serialized frame for one socket."""
+        outbox = self.outboxes.get(websocket)
+        if outbox is None:
+            return
+        queue = outbox[0]
+        if queue.full():
+            # Client isn't keeping up: drop its oldest frame, not the newest
+            queue.get_nowait()
+        queue.put_nowait(payload)
+    
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        # Send errors end the writer; the socket's receive loop sees the
+        # disconnect and cleans up (and announces user-left)
+        try:
+            while True:
+                await websocket.send_text(await queue.get())
+        except Exception:
+            pass
+
+
+class RedisConnectionManager(ConnectionManager):
+    """ConnectionManager that relays room traffic between workers over Redis.
+    
+    Sockets on this worker are still served directly. Every broadcast (and
+    any unicast whose target is not local) is also published on the room's
+    channel, and a reader task hands frames from other workers to local
+    sockets. Room membership is mirrored in a Redis hash so room-info and
+    participant counts cover all workers.
+    """
+    
+    # Membership hashes outlive a crashed worker by at most this long
+    MEMBERS_TTL_SECONDS = 12 * 60 * 60
+    
+    def __init__(self, redis_url: str):
+        super().__init__()
+        self.worker_id = uuid4().hex
+        self.redis = aioredis.from_url(redis_url)
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        self._reader: Optional[asyncio.Task] = None
+    
+    async def connect(self, websocket: WebSocket, room_id: str, user_id: str, user_role: str):
+        if room_id not in self.rooms:
+            await self.pubsub.subscribe(self._channel(room_id))
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+        
+        members_key = self._members_key(room_id)
+        await self.redis.hset(members_key, self._member(websocket), _dumps({
+            "room_id": room_id,
+            "user_id": user_id,
+            "user_role": user_role
+        }))
+        await self.redis.expire(members_key, self.MEMBERS_TTL_SECONDS)
+        
+        await super().connect(websocket, room_id, user_id, user_role)
+    
+    async def disconnect(self, websocket: WebSocket):
+        info = await super().disconnect(websocket)
+        if info:
+            room_id = info["room_id"]
+            await self.redis.hdel(self._members_key(room_id), self._member(websocket))
+            if room_id not in self.rooms:
+                await self.pubsub.unsubscribe(self._channel(room_id))
+        return info
+    
+    async def broadcast_to_room(self, room_id: str, message: dict, exclude: WebSocket = None):
+        payload = _dumps(message)
+        self._deliver_to_room(room_id, payload, exclude)
+        await self._publish(room_id, {"payload": payload})
+    
+    async def send_to_user(self, room_id: str, target_user_id: str, message: dict):
+        payload = _dumps(message)
+        if not self._deliver_to_user(room_id, target_user_id, payload):
+            await self._publish(room_id, {"payload": payload, "target": target_user_id})
+    
+    async def get_room_participants(self, room_id: str) -> list:
+        members = await self.redis.hvals(self._members_key(room_id))
+        return [orjson.loads(member) for member in members]
+    
+    async def get_participants_payload(self, room_id: str) -> Tuple[str, int]:
+        # Membership also changes on other workers, so no local cache
+        participants = await self.get_room_participants(room_id)
+        return _dumps(participants), len(participants)
+    
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        await self.pubsub.aclose()
+        await self.redis.aclose()
+    
+    async def _publish(self, room_id: str, envelope: dict):
+        envelope["origin"] = self.worker_id
+        await self.redis.publish(self._channel(room_id), _dumps(envelope))
+    
+    async def _read(self):
+        while True:
+            try:
+                message = await self.pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                envelope = orjson.loads(message["data"])
+                if envelope["origin"] == self.worker_id:
+                    continue
+                room_id = message["channel"].decode().removeprefix("room:")
+                if "target" in envelope:
+                    self._deliver_to_user(room_id, envelope["target"], envelope["payload"])
+                else:
+                    self._deliver_to_room(room_id, envelope["payload"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Signaling pub/sub error")
+                await asyncio.sleep(1)
+    
+    def _channel(self, room_id: str) -> str:
+        return f"room:{room_id}"
+    
+    def _members_key(self, room_id: str) -> str:
+        return f"room:{room_id}:members"
+    
+    def _member(self, websocket: WebSocket) -> str:
+        return f"{self.worker_id}:{id(websocket)}"
+
+
+def _create_manager() -> ConnectionManager:
+    """In-process manager, or the Redis-backed one when REDIS_URL is set."""
+    if settings.redis_url:
+        if aioredis is not None:
+            return RedisConnectionManager(settings.redis_url)
+        logger.warning("REDIS_URL is set but redis is not installed; signaling stays in-process")
+    return ConnectionManager()
 
 
-manager = ConnectionManager()
+manager = _create_manager()
 
 
 @router.websocket("/ws/signaling/{room_id}")
@@ -112,140 +304,169 @@ async def websocket_signaling(
     # Connect to room
     await manager.connect(websocket, room_id, user_id, user_role)
     
-    # Send current participants
-    participants = manager.get_room_participants(room_id)
-    await websocket.send_json({
-        "type": "room-info",
-        "room_id": room_id,
-        "participants": participants,
-        "your_id": user_id
-    })
+    # Send current participants (spliced in pre-serialized)
+    participants, _ = await manager.get_participants_payload(room_id)
+    manager.send_text(
+        websocket,
+        f'{{"type":"room-info","room_id":{_dumps(room_id)},"participants":{participants},"your_id":{_dumps(user_id)}}}'
+    )
     
     try:
         while True:
-            data = await websocket.receive_json()
-            message_type = data.get("type")
-            
-            if message_type == "offer":
-                # WebRTC offer - send to target user
-                target_id = data.get("target_id")
-                await manager.send_to_user(room_id, target_id, {
-                    "type": "offer",
-                    "offer": data.get("offer"),
-                    "from_id": user_id,
-                    "from_role": user_role
-                })
-            
-            elif message_type == "answer":
-                # WebRTC answer - send to target user
-                target_id = data.get("target_id")
-                await manager.send_to_user(room_id, target_id, {
-                    "type": "answer",
-                    "answer": data.get("answer"),
-                    "from_id": user_id
-                })
-            
-            elif message_type == "ice-candidate":
-                # ICE candidate - send to target user
-                target_id = data.get("target_id")
-                await manager.send_to_user(room_id, target_id, {
-                    "type": "ice-candidate",
-                    "candidate": data.get("candidate"),
-                    "from_id": user_id
-                })
-            
-            elif message_type == "recording-started":
-                # Notify room that recording has started
-                await manager.broadcast_to_room(room_id, {
-                    "type": "recording-started",
-                    "started_by": user_id
-                })
-            
-            elif message_type == "recording-stopped":
-                # Notify room that recording has stopped
-                await manager.broadcast_to_room(room_id, {
-                    "type": "recording-stopped",
-                    "stopped_by": user_id
-                })
-            
-            elif message_type == "consent-requested":
-                # Doctor requesting consent from patient
-                await manager.broadcast_to_room(room_id, {
-                    "type": "consent-requested",
-                    "requested_by": user_id
-                }, exclude=websocket)
-            
-            elif message_type == "consent-response":
-                # Patient responding to consent request
-                await manager.broadcast_to_room(room_id, {
-                    "type": "consent-response",
-                    "granted": data.get("granted"),
-                    "from_id": user_id
-                }, exclude=websocket)
-            
-            elif message_type == "chat-message":
-                # In-call chat message - save to database and broadcast
-                try:
-                    from app.models.models import ChatMessage
-                    from app.core import get_session
-                    
-                    # Get session
-                    async for session in get_session():
-                        # Save message to database
-                        chat_msg = ChatMessage(
-                            interview_id=data.get("interview_id"),
-                            sender_id=user_id,
-                            message=data.get("message", "")[:1000]  # Max 1000 chars
-                        )
-                        session.add(chat_msg)
-                        await session.commit()
-                        await session.refresh(chat_msg)
-                        
-                        # Broadcast to room (exclude sender - they'll add it locally)
-                        await manager.broadcast_to_room(room_id, {
-                            "type": "chat-message",
-                            "id": chat_msg.id,
-                            "sender_id": user_id,
-                            "sender_role": user_role,
-                            "message": chat_msg.message,
-                            "created_at": chat_msg.created_at.isoformat()
-                        }, exclude=websocket)
-                        break
-                        
-                except Exception as e:
-                    print(f"Error saving chat message: {e}")
-                    # Even if save fails, still broadcast for real-time UX
-                    await manager.broadcast_to_room(room_id, {
-                        "type": "chat-message",
-                        "sender_id": user_id,
-                        "sender_role": user_role,
-                        "message": data.get("message", ""),
-                        "created_at": datetime.utcnow().isoformat(),
-                        "error": "Message may not be saved"
-                    })
-            
-            elif message_type == "ping":
-                await websocket.send_json({"type": "pong"})
+            data = orjson.loads(await websocket.receive_text())
+            handler = MESSAGE_HANDLERS.get(data.get("type"))
+            if handler is not None:
+                await handler(websocket, room_id, user_id, user_role, data)
     
     except WebSocketDisconnect:
-        info = manager.disconnect(websocket)
+        info = await manager.disconnect(websocket)
         if info:
             await manager.broadcast_to_room(room_id, {
                 "type": "user-left",
                 "user_id": info["user_id"],
                 "user_role": info["user_role"]
             })
-    except Exception as e:
-        print(f"WebSocket error: {e}")
-        manager.disconnect(websocket)
+    except Exception:
+        logger.exception("WebSocket error")
+        await manager.disconnect(websocket)
 
 
 @router.get("/ws/room/{room_id}/participants")
 async def get_room_participants(room_id: str):
     """Get current participants in a room."""
-    participants = manager.get_room_participants(room_id)
-    return {
-        "room_id": room_id,
-        "participants": participants,
-        "count": len(participants)
-    }
+    participants, count = await manager.get_participants_payload(room_id)
+    return Response(
+        content=f'{{"room_id":{_dumps(room_id)},"participants":{participants},"count":{count}}}',
+        media_type="application/json"
+    )
+
+
+# Per-message-type handlers for websocket_signaling; each gets
+# (websocket, room_id, user_id, user_role, data)
+
+async def _handle_offer(websocket: WebSocket, room_id: str, user_id: str, user_role: str, data: dict):
+    # WebRTC offer - send to target user
+    await manager.send_to_user(room_id, data.get("target_id"), {
+        "type": "offer",
+        "offer": data.get("offer"),
+        "from_id": user_id,
+        "from_role": user_role
+    })
+
+
+async def _handle_answer(websocket: WebSocket, room_id: str, user_id: str, user_role: str, data: dict):
+    # WebRTC answer - send to target user
+    await manager.send_to_user(room_id, data.get("target_id"), {
+        "type": "answer",
+        "answer": data.get("answer"),
+        "from_id": user_id
+    })
+
+
+async def _handle_ice_candidate(websocket: WebSocket, room_id: str, user_id: str, user_role: str, data: dict):
+    # ICE candidate - send to target user
+    await manager.send_to_user(room_id, data.get("target_id"), {
+        "type": "ice-candidate",
+        "candidate": data.get("candidate"),
+        "from_id": user_id
+    })
+
+
+async def _handle_recording_started(websocket: WebSocket, room_id: str, user_id: str, user_role: str, data: dict):
+    # Notify room that recording has started
+    await manager.broadcast_to_room(room_id, {
+        "type": "recording-started",
+        "started_by": user_id
+    })
+
+
+async def _handle_recording_stopped(websocket: WebSocket, room_id: str, user_id: str, user_role: str, data: dict):
+    # Notify room that recording has stopped
+    await manager.broadcast_to_room(room_id, {
+        "type": "recording-stopped",
+        "stopped_by": user_id
+    })
+
+
+async def _handle_consent_requested(websocket: WebSocket, room_id: str, user_id: str, user_role: str, data: dict):
+    # Doctor requesting consent from patient
+    await manager.broadcast_to_room(room_id, {
+        "type": "consent-requested",
+        "requested_by": user_id
+    }, exclude=websocket)
+
+
+async def _handle_consent_response(websocket: WebSocket, room_id: str, user_id: str, user_role: str, data: dict):
+    # Patient responding to consent request
+    await manager.broadcast_to_room(room_id, {
+        "type": "consent-response",
+        "granted": data.get("granted"),
+        "from_id": user_id
+    }, exclude=websocket)
+
+
+async def _handle_chat_message(websocket: WebSocket, room_id: str, user_id: str, user_role: str, data: dict):
+    # In-call chat message - save to database and broadcast
+    try:
+        from app.models.models import ChatMessage, ChatMessageCreate
+        from app.core import get_session
+        
+        # Rejects a malformed interview_id before it reaches the UUID column
+        payload = ChatMessageCreate(
+            interview_id=data.get("interview_id"),
+            message=data.get("message", "")[:1000]  # Max 1000 chars
+        )
+        
+        # Get session
+        async for session in get_session():
+            # Save message to database
+            chat_msg = ChatMessage(
+                interview_id=payload.interview_id,
+                sender_id=user_id,
+                message=payload.message
+            )
+            session.add(chat_msg)
+            # id is set client-side and the server-default created_at comes
+            # back through INSERT ... RETURNING; both stay loaded after commit
+            # (expire_on_commit=False), so no refresh SELECT
+            await session.commit()
+            
+            # Broadcast to room (exclude sender - they'll add it locally)
+            await manager.broadcast_to_room(room_id, {
+                "type": "chat-message",
+                "id": chat_msg.id,
+                "sender_id": user_id,
+                "sender_role": user_role,
+                "message": chat_msg.message,
+                "created_at": chat_msg.created_at.isoformat()
+            }, exclude=websocket)
+            break
+            
+    except Exception:
+        logger.exception("Error saving chat message")
+        # Even if save fails, still broadcast for real-time UX
+        await manager.broadcast_to_room(room_id, {
+            "type": "chat-message",
+            "sender_id": user_id,
+            "sender_role": user_role,
+            "message": data.get("message", ""),
+            "created_at": datetime.utcnow().isoformat(),
+            "error": "Message may not be saved"
+        })
+
+
+async def _handle_ping(websocket: WebSocket, room_id: str, user_id: str, user_role: str, data: dict):
+    manager.send_text(websocket, PONG_PAYLOAD)
+
+
+MESSAGE_HANDLERS = {
+    "offer": _handle_offer,
+    "answer": _handle_answer,
+    "ice-candidate": _handle_ice_candidate,
+    "recording-started": _handle_recording_started,
+    "recording-stopped": _handle_recording_stopped,
+    "consent-requested": _handle_consent_requested,
+    "consent-response": _handle_consent_response,
+    "chat-message": _handle_chat_message,
+    "ping": _handle_ping,
+}
@@ -1,35 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+import os
+import re
+from typing import Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from app.core import get_current_user
 from app.models import User
-from app.services import get_storage_provider
+from app.services import LocalStorageProvider, get_storage_provider
 
 router = APIRouter(prefix="/storage", tags=["Storage"])
 
+# Content type by file extension
+MIME_TYPES = {
+    ".txt": "text/plain",
+    ".webm": "video/webm",
+    ".mp4": "video/mp4",
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+}
+
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
 
 @router.get("/{path:path}")
 async def get_file(
     path: str,
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
-    """Get a file from storage (with authentication)."""
+    """Get a file from storage (with authentication); supports single byte ranges."""
     storage = get_storage_provider()
     
-    if not await storage.exists(path):
+    size = await storage.get_size(path)
+    if size is None:
         raise HTTPException(status_code=404, detail="File not found")
     
-    content = await storage.get(path)
+    content_type = MIME_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+    
+    # Video players seek with Range requests; answer those with just the bytes asked for
+    range_header = request.headers.get("range")
+    if range_header and "," not in range_header:
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        start, end = byte_range
+        return StreamingResponse(
+            storage.open_stream(path, start=start, end=end),
+            status_code=206,
+            media_type=content_type,
+            headers={
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+                "Accept-Ranges": "bytes"
+            }
+        )
     
-    # Determine content type
-    content_type = "application/octet-stream"
-    if path.endswith(".txt"):
-        content_type = "text/plain"
-    elif path.endswith(".webm"):
-        content_type = "video/webm"
-    elif path.endswith(".mp4"):
-        content_type = "video/mp4"
-    elif path.endswith(".wav"):
-        content_type = "audio/wav"
-    elif path.endswith(".mp3"):
-        content_type = "audio/mpeg"
+    # Stream instead of loading whole recordings into memory; local files
+    # go out via FileResponse (sendfile where the server supports it)
+    if isinstance(storage, LocalStorageProvider):
+        return FileResponse(
+            storage._get_full_path(path), media_type=content_type, headers={"Accept-Ranges": "bytes"}
+        )
+    return StreamingResponse(
+        storage.open_stream(path),
+        media_type=content_type,
+        headers={"Content-Length": str(size), "Accept-Ranges": "bytes"}
+    )
+
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range "bytes=start-end" header into an inclusive (start, end).
     
-    return Response(content=content, media_type=content_type)
+    Returns None when the range cannot be satisfied.
+    """
+    match = _RANGE_RE.fullmatch(range_header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start > end:
+        return None
+    return start, end
@@ -7,6 +7,7 @@ from app.core.security import (
     decode_token,
     get_current_user,
     get_current_active_user,
+    invalidate_user,
     requires_role,
     get_doctor_user,
     get_patient_user,
@@ -17,6 +18,6 @@ __all__ = [
     "get_settings", "Settings",
     "get_session", "init_db", "engine",
     "verify_password", "get_password_hash", "create_access_token", "decode_token",
-    "get_current_user", "get_current_active_user", "requires_role",
+    "get_current_user", "get_current_active_user", "invalidate_user", "requires_role",
     "get_doctor_user", "get_patient_user", "oauth2_scheme"
 ]
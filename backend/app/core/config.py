@@ -9,12 +9,44 @@ load_dotenv()
 class Settings(BaseSettings):
     # Database
     database_url: str = "postgresql+asyncpg://ombiradar@localhost:5432/care_platform"
+    db_pool_size: int = 20
+    db_max_overflow: int = 40
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800  # seconds
+    db_pool_timeout: int = 10  # seconds to wait for a free connection
+    db_query_cache_size: int = 1200  # compiled SQL statements kept per engine
+    db_prepared_statement_cache_size: int = 1024  # per asyncpg connection
     
     # JWT
     secret_key: str = "your-super-secret-key-change-in-production-min-32-chars"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60
     
+    # Argon2 password hashing cost (RFC 9106 low-memory profile)
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65536  # KiB
+    argon2_parallelism: int = 4
+    
+    # Auth user cache (skips the user lookup for recently seen users)
+    user_cache_maxsize: int = 4096
+    user_cache_ttl_seconds: int = 30
+    
+    # Decoded JWT cache (skips signature verification for repeat tokens)
+    token_cache_maxsize: int = 8192
+    token_cache_ttl_seconds: int = 300
+    
+    # Response cache for GET /api/auth/doctors. Per process and only cleared on
+    # the worker that handled the change, so other workers may serve a
+    # stale doctor list for up to this long
+    doctor_list_cache_ttl_seconds: int = 300
+    
+    # Background audit writer: flush every N entries or after this many ms
+    audit_batch_size: int = 100
+    audit_flush_interval_ms: int = 200
+    
+    # Signaling fan-out across workers via Redis pub/sub (empty = single process)
+    redis_url: str = ""
+    
     # Storage
     storage_provider: str = "local"  # Change to "s3" for production
     local_storage_path: str = "./storage"
@@ -31,6 +63,11 @@ class Settings(BaseSettings):
     smtp_user: str = ""
     smtp_password: str = ""
     from_email: str = "noreply@careplatform.com"
+    smtp_pool_size: int = 5  # SMTP connections kept open per worker
+    smtp_max_messages_per_connection: int = 100
+    smtp_idle_timeout_seconds: int = 60  # reconnect instead of reusing older idle connections
+    smtp_send_retries: int = 2  # background retries after a failed send
+    email_queue_size: int = 1000  # queued emails before enqueueing waits
     
     # Scheduler
     enable_scheduler: bool = True  # Set to False to disable automated reminders
@@ -44,6 +81,6 @@ class Settings(BaseSettings):
         extra = "ignore"
 
 
-@lru_cache()
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
     return Settings()
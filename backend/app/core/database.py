@@ -1,20 +1,32 @@
 from sqlmodel import SQLModel
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.core.config import get_settings
 
 settings = get_settings()
 
+# Let the server drop dead TCP connections instead of handing them to requests,
+# and keep enough prepared statements per connection for every hot query
+connect_args = {}
+if settings.database_url.startswith("postgresql+asyncpg"):
+    connect_args["server_settings"] = {"tcp_keepalives_idle": "30"}
+    connect_args["prepared_statement_cache_size"] = settings.db_prepared_statement_cache_size
+
 engine = create_async_engine(
     settings.database_url,
     echo=False,
     future=True,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10
+    pool_pre_ping=settings.db_pool_pre_ping,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle,
+    pool_timeout=settings.db_pool_timeout,
+    query_cache_size=settings.db_query_cache_size,
+    connect_args=connect_args
 )
 
-async_session = sessionmaker(
+# Shared by request handlers, background tasks and the scheduler. Attributes
+# stay loaded after commit, so handlers can serialize without a refresh.
+async_session = async_sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False
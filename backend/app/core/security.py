@@ -1,10 +1,17 @@
+import time
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from typing import Optional, Tuple
+from cachetools import TTLCache
+import jwt
+from jwt import PyJWTError as JWTError
+import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import bindparam, lambda_stmt
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import select
 
 from app.core.config import get_settings
@@ -13,39 +20,110 @@ from app.models import User, UserRole, TokenData
 
 settings = get_settings()
 
-pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+# New hashes are Argon2id; bcrypt hashes from older accounts still verify
+password_hasher = PasswordHasher(
+    time_cost=settings.argon2_time_cost,
+    memory_cost=settings.argon2_memory_cost,
+    parallelism=settings.argon2_parallelism
+)
+_BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# JWT config resolved once at import instead of on every encode/decode
+_JWT_SECRET = settings.secret_key.encode()
+_JWT_ALGORITHM = settings.algorithm
+_JWT_ALGORITHMS = [settings.algorithm]
+_ACCESS_TOKEN_EXPIRES = timedelta(minutes=settings.access_token_expire_minutes)
+
+# Auth lookup as a lambda statement, built and cache-keyed once
+_SELECT_USER_BY_ID = lambda_stmt(lambda: select(User).where(User.id == bindparam("user_id")))
+
+# raw token -> (TokenData, exp as unix time); only valid tokens are cached
+_token_cache: TTLCache = TTLCache(
+    maxsize=settings.token_cache_maxsize,
+    ttl=settings.token_cache_ttl_seconds
+)
+
+# user_id -> detached User snapshot, so warm requests skip the user SELECT
+_user_cache: TTLCache = TTLCache(
+    maxsize=settings.user_cache_maxsize,
+    ttl=settings.user_cache_ttl_seconds
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    # Dispatch on the hash prefix and call the C implementations directly
+    try:
+        if hashed_password.startswith("$argon2"):
+            return password_hasher.verify(hashed_password, plain_password)
+        if hashed_password.startswith(_BCRYPT_PREFIXES):
+            return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    except (VerificationError, InvalidHashError, ValueError):
+        return False
+    return False
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    to_encode["exp"] = datetime.utcnow() + (expires_delta or _ACCESS_TOKEN_EXPIRES)
+    encoded_jwt = jwt.encode(to_encode, _JWT_SECRET, algorithm=_JWT_ALGORITHM)
     return encoded_jwt
 
 
 def decode_token(token: str) -> Optional[TokenData]:
+    cached: Optional[Tuple[TokenData, float]] = _token_cache.get(token)
+    if cached is not None:
+        token_data, expires_at = cached
+        if expires_at > time.time():
+            return token_data
+        _token_cache.pop(token, None)
+        return None
+    
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = jwt.decode(token, _JWT_SECRET, algorithms=_JWT_ALGORITHMS)
         user_id: str = payload.get("sub")
         role: str = payload.get("role")
         if user_id is None:
             return None
-        return TokenData(user_id=user_id, role=UserRole(role) if role else None)
-    except JWTError:
+        token_data = TokenData(user_id=user_id, role=UserRole(role) if role else None)
+    except (JWTError, ValueError):  # ValueError: malformed sub or role claim
         return None
+    
+    # PyJWT has already rejected expired tokens; remember exp so a cached
+    # entry never outlives the token itself
+    expires_at = payload.get("exp")
+    if expires_at is not None:
+        _token_cache[token] = (token_data, float(expires_at))
+    return token_data
+
+
+def invalidate_user(user_id: str) -> None:
+    """Drop a user from the auth cache so the next request reloads it."""
+    _user_cache.pop(user_id, None)
+
+
+def _cache_user(user: User) -> None:
+    # Cache a detached copy rather than the instance owned by this session
+    snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+    make_transient_to_detached(snapshot)
+    _user_cache[user.id] = snapshot
+
+
+async def _fetch_user_by_id(session: AsyncSession, user_id: str) -> Optional[User]:
+    cached = _user_cache.get(user_id)
+    if cached is not None:
+        # Attach to this session without emitting a SELECT
+        return await session.merge(cached, load=False)
+    
+    result = await session.execute(_SELECT_USER_BY_ID, {"user_id": user_id})
+    user = result.scalar_one_or_none()
+    if user is not None:
+        _cache_user(user)
+    return user
 
 
 async def get_current_user(
@@ -62,8 +140,7 @@ async def get_current_user(
     if token_data is None:
         raise credentials_exception
     
-    result = await session.execute(select(User).where(User.id == token_data.user_id))
-    user = result.scalar_one_or_none()
+    user = await _fetch_user_by_id(session, token_data.user_id)
     
     if user is None:
         raise credentials_exception
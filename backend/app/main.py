@@ -60,18 +60,38 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import logging
+import logging.handlers
 import os  # ✅ ADD THIS
+import queue
 
-from app.core import init_db
+from app.core import init_db, engine
 from app.api import api_router
+from app.api.signaling import manager as signaling_manager
+from app.services import get_background_audit_service
+from app.services.email_service import close_email_service
 from app.services.scheduler import get_scheduler
 
 
+def _start_log_listener() -> logging.handlers.QueueListener:
+    """Route root logging through a queue so formatting and stream writes
+    happen on the listener thread instead of the event loop."""
+    log_queue = queue.Queue(-1)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    logging.getLogger().addHandler(logging.handlers.QueueHandler(log_queue))
+    listener.start()
+    return listener
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # ✅ ENSURE STORAGE DIRECTORY EXISTS (Render safe)
     os.makedirs(os.getenv("LOCAL_STORAGE_PATH", "/tmp/storage"), exist_ok=True)
 
+    log_listener = _start_log_listener()
+
     # Startup
     await init_db()
     
@@ -83,6 +103,11 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     scheduler.shutdown()
+    await signaling_manager.close()
+    await get_background_audit_service().close()
+    await close_email_service()
+    await engine.dispose()
+    log_listener.stop()
 
 
 app = FastAPI(
@@ -103,6 +128,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include API routes
@@ -122,3 +148,22 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+
+
+if __name__ == "__main__":
+    import uvicorn
+    from app.core import get_settings
+
+    settings = get_settings()
+    # uvloop/httptools ship with uvicorn[standard]. Per-message deflate costs
+    # CPU on every small signaling frame, and SDP/ICE frames stay far below 1 MiB.
+    uvicorn.run(
+        app,
+        host=settings.host,
+        port=settings.port,
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+        ws_per_message_deflate=False,
+        ws_max_size=1 << 20
+    )
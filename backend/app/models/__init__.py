@@ -2,18 +2,20 @@ from app.models.models import (
     User, UserCreate, UserRead, UserLogin, UserRole,
     Appointment, AppointmentCreate, AppointmentRead, AppointmentUpdate, AppointmentStatus,
     Consent, ConsentCreate, ConsentRead, ConsentUpdate, ConsentStatus,
-    Interview, InterviewCreate, InterviewRead, InterviewUpdate,
+    Interview, InterviewCreate, InterviewRead, InterviewUpdate, TranscriptStatus,
     AuditLog, AuditLogCreate, AuditLogRead, AuditAction,
     Token, TokenData,
-    Notification, NotificationType
+    Notification, NotificationType,
+    IdStr
 )
 
 __all__ = [
     "User", "UserCreate", "UserRead", "UserLogin", "UserRole",
     "Appointment", "AppointmentCreate", "AppointmentRead", "AppointmentUpdate", "AppointmentStatus",
     "Consent", "ConsentCreate", "ConsentRead", "ConsentUpdate", "ConsentStatus",
-    "Interview", "InterviewCreate", "InterviewRead", "InterviewUpdate",
+    "Interview", "InterviewCreate", "InterviewRead", "InterviewUpdate", "TranscriptStatus",
     "AuditLog", "AuditLogCreate", "AuditLogRead", "AuditAction",
     "Token", "TokenData",
-    "Notification", "NotificationType"
+    "Notification", "NotificationType",
+    "IdStr"
 ]
@@ -1,17 +1,72 @@
 from datetime import datetime
 from enum import Enum
-from typing import Optional, List
+from typing import Annotated, Any, Optional, List
+from pydantic import StringConstraints
+from sqlalchemy import DDL, FetchedValue, Index, Uuid, event, text
+from sqlalchemy.types import TypeDecorator
 from sqlmodel import SQLModel, Field, Relationship
-from uuid import uuid4
-import random
-import string
+import os
+import uuid
 
 
-def generate_meeting_number() -> str:
-    """Generate unique meeting number like CARE-2026-XXXX"""
-    year = datetime.utcnow().year
-    random_part = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-    return f"CARE-{year}-{random_part}"
+# Random bytes for new_id(), drawn from the OS CSPRNG one batch at a time
+# so inserts pay for os.urandom once per ID_BUFFER_SIZE ids
+ID_BUFFER_SIZE = 256
+_id_buffer: List[bytes] = []
+os.register_at_fork(after_in_child=_id_buffer.clear)  # never share ids with the parent
+
+
+def new_id() -> str:
+    """Random (version 4) UUID string, same format as str(uuid.uuid4())."""
+    try:
+        raw = _id_buffer.pop()
+    except IndexError:
+        data = os.urandom(16 * ID_BUFFER_SIZE)
+        _id_buffer.extend(data[i:i + 16] for i in range(16, len(data), 16))
+        raw = data[:16]
+    b = bytearray(raw)
+    b[6] = b[6] & 0x0F | 0x40  # version 4
+    b[8] = b[8] & 0x3F | 0x80  # RFC 4122 variant
+    h = b.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+# Naive UTC, like the datetime.utcnow() values the app compares against
+UTC_NOW = text("timezone('utc', now())")
+
+
+def server_timestamp() -> Any:
+    """Timestamp column stamped by the database on INSERT. PostgreSQL
+    RETURNING hands the value back during flush, so it is loaded without a
+    refresh."""
+    return Field(default=None, nullable=False, sa_column_kwargs={"server_default": UTC_NOW})
+
+
+class UUIDString(TypeDecorator):
+    """Native 16-byte UUID column that reads and writes plain strings.
+    
+    Values bind as uuid.UUID, the same type asyncpg returns, so
+    INSERT..RETURNING batches (used to fetch server defaults) match rows
+    back to their parameters without a custom sentinel resolver.
+    Malformed ids raise; request ids are validated as IdStr first.
+    """
+    impl = Uuid(as_uuid=True)
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        return uuid.UUID(value)
+    
+    def process_result_value(self, value, dialect):
+        return None if value is None else str(value)
+
+
+# Request-side id (path, query and body params that reach a UUIDString
+# column): malformed ids fail validation with a 422 instead of being bound
+IdStr = Annotated[str, StringConstraints(
+    pattern=r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+)]
 
 
 class UserRole(str, Enum):
@@ -26,6 +81,12 @@ class AppointmentStatus(str, Enum):
     COMPLETED = "completed"
 
 
+class TranscriptStatus(str, Enum):
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+
+
 class ConsentStatus(str, Enum):
     PENDING = "pending"
     GRANTED = "granted"
@@ -52,12 +113,16 @@ class UserBase(SQLModel):
 
 class User(UserBase, table=True):
     __tablename__ = "users"
+    # Backs the list_doctors ordering
+    __table_args__ = (
+        Index("ix_users_role_full_name", "role", "full_name", "id"),
+    )
     
-    id: str = Field(default_factory=lambda: str(uuid4()), primary_key=True)
+    id: str = Field(default_factory=new_id, primary_key=True, sa_type=UUIDString)
     password_hash: str
     is_active: bool = Field(default=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = server_timestamp()
+    updated_at: Optional[datetime] = server_timestamp()
     
     # Relationships
     doctor_appointments: List["Appointment"] = Relationship(
@@ -95,15 +160,26 @@ class AppointmentBase(SQLModel):
 
 class Appointment(AppointmentBase, table=True):
     __tablename__ = "appointments"
+    # Back keyset pagination of list_appointments per doctor / patient, and
+    # the scheduler's confirmed-appointments-in-window scan
+    __table_args__ = (
+        Index("ix_appointments_doctor_scheduled_id", "doctor_id", "scheduled_time", "id"),
+        Index("ix_appointments_patient_scheduled_id", "patient_id", "scheduled_time", "id"),
+        Index("ix_appointments_status_scheduled", "status", "scheduled_time"),
+    )
     
-    id: str = Field(default_factory=lambda: str(uuid4()), primary_key=True)
-    meeting_number: str = Field(default_factory=generate_meeting_number, unique=True, index=True)
-    doctor_id: str = Field(foreign_key="users.id")
-    patient_id: str = Field(foreign_key="users.id")
+    id: str = Field(default_factory=new_id, primary_key=True, sa_type=UUIDString)
+    # Filled in by the appointments_meeting_number trigger (see below)
+    meeting_number: Optional[str] = Field(
+        default=None, unique=True, index=True, nullable=False,
+        sa_column_kwargs={"server_default": FetchedValue()}
+    )
+    doctor_id: str = Field(foreign_key="users.id", sa_type=UUIDString)
+    patient_id: str = Field(foreign_key="users.id", sa_type=UUIDString)
     status: AppointmentStatus = Field(default=AppointmentStatus.PENDING)
-    room_id: str = Field(default_factory=lambda: str(uuid4()))
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    room_id: str = Field(default_factory=new_id, sa_type=UUIDString)
+    created_at: Optional[datetime] = server_timestamp()
+    updated_at: Optional[datetime] = server_timestamp()
     
     # Relationships
     doctor: Optional[User] = Relationship(
@@ -119,6 +195,35 @@ class Appointment(AppointmentBase, table=True):
     notifications: List["Notification"] = Relationship(back_populates="appointment")
 
 
+# Meeting numbers like CARE-2026-000001A, assigned in the database from a
+# sequence: no Python call per insert, and the unique index only appends.
+# Seven hex digits never collide with the older random six-character ones.
+MEETING_NUMBER_DDL = (
+    "CREATE SEQUENCE IF NOT EXISTS appointments_meeting_seq",
+    """
+    CREATE OR REPLACE FUNCTION set_appointment_meeting_number() RETURNS trigger AS $$
+    DECLARE
+        suffix text;
+    BEGIN
+        IF NEW.meeting_number IS NULL THEN
+            suffix := upper(to_hex(nextval('appointments_meeting_seq')));
+            NEW.meeting_number := 'CARE-' || extract(year FROM now())::int || '-'
+                || lpad(suffix, greatest(7, length(suffix)), '0');
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS appointments_meeting_number ON appointments",
+    """
+    CREATE TRIGGER appointments_meeting_number BEFORE INSERT ON appointments
+    FOR EACH ROW EXECUTE FUNCTION set_appointment_meeting_number()
+    """,
+)
+for _statement in MEETING_NUMBER_DDL:
+    event.listen(Appointment.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
+
 class NotificationType(str, Enum):
     APPOINTMENT_REMINDER = "appointment_reminder"
     APPOINTMENT_CONFIRMATION = "appointment_confirmation"
@@ -133,13 +238,21 @@ class NotificationType(str, Enum):
 
 class Notification(SQLModel, table=True):
     __tablename__ = "notifications"
+    # Back the newest-first list, the unread count / list / mark-all-read
+    # (a partial index over the few unread rows), and the per-appointment
+    # "already sent?" reminder checks
+    __table_args__ = (
+        Index("ix_notifications_user_sent", "user_id", "sent_at"),
+        Index("ix_notifications_unread", "user_id", "sent_at", postgresql_where=text("read = false")),
+        Index("ix_notifications_appointment_type", "appointment_id", "type"),
+    )
 
-    id: str = Field(default_factory=lambda: str(uuid4()), primary_key=True)
-    user_id: str = Field(foreign_key="users.id")
-    appointment_id: Optional[str] = Field(default=None, foreign_key="appointments.id")
+    id: str = Field(default_factory=new_id, primary_key=True, sa_type=UUIDString)
+    user_id: str = Field(foreign_key="users.id", sa_type=UUIDString)
+    appointment_id: Optional[str] = Field(default=None, foreign_key="appointments.id", sa_type=UUIDString)
     type: NotificationType
     message: str
-    sent_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = server_timestamp()
     read: bool = Field(default=False)
 
     # Relationships
@@ -148,7 +261,7 @@ class Notification(SQLModel, table=True):
 
 
 class AppointmentCreate(AppointmentBase):
-    doctor_id: str
+    doctor_id: IdStr
 
 
 class AppointmentRead(AppointmentBase):
@@ -171,28 +284,32 @@ class AppointmentUpdate(SQLModel):
 
 # Consent Models
 class ConsentBase(SQLModel):
-    appointment_id: str = Field(foreign_key="appointments.id")
+    appointment_id: str = Field(foreign_key="appointments.id", sa_type=UUIDString)
 
 
 class Consent(ConsentBase, table=True):
     __tablename__ = "consents"
+    # One consent per appointment; also the ON CONFLICT target in create_consent_request
+    __table_args__ = (
+        Index("ix_consents_appointment_id", "appointment_id", unique=True),
+    )
     
-    id: str = Field(default_factory=lambda: str(uuid4()), primary_key=True)
-    patient_id: str = Field(foreign_key="users.id")
+    id: str = Field(default_factory=new_id, primary_key=True, sa_type=UUIDString)
+    patient_id: str = Field(foreign_key="users.id", sa_type=UUIDString)
     status: ConsentStatus = Field(default=ConsentStatus.PENDING)
     consent_text: str = Field(
         default="I consent to the recording and transcription of this medical interview for documentation purposes."
     )
     granted_at: Optional[datetime] = None
     ip_address: Optional[str] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = server_timestamp()
     
     # Relationships
     appointment: Optional[Appointment] = Relationship(back_populates="consent")
 
 
 class ConsentCreate(SQLModel):
-    appointment_id: str
+    appointment_id: IdStr
 
 
 class ConsentUpdate(SQLModel):
@@ -212,23 +329,25 @@ class ConsentRead(SQLModel):
 
 # Interview Models
 class InterviewBase(SQLModel):
-    appointment_id: str = Field(foreign_key="appointments.id", unique=True)
+    appointment_id: str = Field(foreign_key="appointments.id", sa_type=UUIDString, unique=True)
 
 
 class Interview(InterviewBase, table=True):
     __tablename__ = "interviews"
     
-    id: str = Field(default_factory=lambda: str(uuid4()), primary_key=True)
+    id: str = Field(default_factory=new_id, primary_key=True, sa_type=UUIDString)
     recording_path: Optional[str] = None
     transcript_path: Optional[str] = None
     transcript_text: Optional[str] = None
+    # State of the background Whisper job for the uploaded recording
+    transcript_status: Optional[TranscriptStatus] = None
     summary_text: Optional[str] = None
     key_points: Optional[str] = None  # JSON string of key points
     duration_seconds: Optional[int] = None
     started_at: Optional[datetime] = None
     ended_at: Optional[datetime] = None
     summarized_at: Optional[datetime] = None  # When summary was generated
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = server_timestamp()
     
     # Relationships
     appointment: Optional[Appointment] = Relationship(back_populates="interview")
@@ -236,7 +355,7 @@ class Interview(InterviewBase, table=True):
 
 
 class InterviewCreate(SQLModel):
-    appointment_id: str
+    appointment_id: IdStr
 
 
 class InterviewRead(SQLModel):
@@ -245,6 +364,7 @@ class InterviewRead(SQLModel):
     recording_path: Optional[str]
     transcript_path: Optional[str]
     transcript_text: Optional[str]
+    transcript_status: Optional[TranscriptStatus] = None
     summary_text: Optional[str]
     key_points: Optional[str]
     duration_seconds: Optional[int]
@@ -282,15 +402,19 @@ class AuditAction(str, Enum):
 
 class AuditLog(SQLModel, table=True):
     __tablename__ = "audit_logs"
+    # Backs keyset pagination (user_id, created_at DESC, id DESC) via a backward index scan
+    __table_args__ = (
+        Index("ix_audit_logs_user_created_id", "user_id", "created_at", "id"),
+    )
     
-    id: str = Field(default_factory=lambda: str(uuid4()), primary_key=True)
-    user_id: str = Field(foreign_key="users.id")
+    id: str = Field(default_factory=new_id, primary_key=True, sa_type=UUIDString)
+    user_id: str = Field(foreign_key="users.id", sa_type=UUIDString)
     action: AuditAction
     resource_type: str
     resource_id: Optional[str] = None
     details: Optional[str] = None
     ip_address: Optional[str] = None
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = server_timestamp()
     
     # Relationships
     user: Optional[User] = Relationship(back_populates="audit_logs")
@@ -324,7 +448,7 @@ class Token(SQLModel):
 
 
 class TokenData(SQLModel):
-    user_id: Optional[str] = None
+    user_id: Optional[IdStr] = None
     role: Optional[UserRole] = None
 
 
@@ -332,11 +456,11 @@ class TokenData(SQLModel):
 class ChatMessage(SQLModel, table=True):
     __tablename__ = "chat_messages"
     
-    id: str = Field(default_factory=lambda: str(uuid4()), primary_key=True)
-    interview_id: str = Field(foreign_key="interviews.id", index=True)
-    sender_id: str = Field(foreign_key="users.id")
+    id: str = Field(default_factory=new_id, primary_key=True, sa_type=UUIDString)
+    interview_id: str = Field(foreign_key="interviews.id", sa_type=UUIDString, index=True)
+    sender_id: str = Field(foreign_key="users.id", sa_type=UUIDString)
     message: str = Field(max_length=1000)  # Max 1000 chars
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = server_timestamp()
     
     # Relationships
     interview: Optional[Interview] = Relationship(back_populates="chat_messages")
@@ -344,7 +468,7 @@ class ChatMessage(SQLModel, table=True):
 
 
 class ChatMessageCreate(SQLModel):
-    interview_id: str
+    interview_id: IdStr
     message: str
 
 
@@ -1,6 +1,6 @@
 from app.services.storage import StorageProvider, LocalStorageProvider, S3StorageProvider, get_storage_provider, generate_storage_key
 from app.services.transcription import TranscriptionService, get_transcription_service
-from app.services.audit import AuditService, get_audit_service
+from app.services.audit import AuditService, BackgroundAuditService, get_audit_service, get_background_audit_service
 from app.services.notification import NotificationService, get_notification_service
 from app.services.email_service import EmailService, get_email_service
 
@@ -8,7 +8,7 @@ __all__ = [
     "StorageProvider", "LocalStorageProvider", "S3StorageProvider",
     "get_storage_provider", "generate_storage_key",
     "TranscriptionService", "get_transcription_service",
-    "AuditService", "get_audit_service",
+    "AuditService", "BackgroundAuditService", "get_audit_service", "get_background_audit_service",
     "NotificationService", "get_notification_service",
     "EmailService", "get_email_service"
 ]
@@ -1,11 +1,18 @@
+import asyncio
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+from fastapi import Depends
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import get_settings
+from app.core.database import async_session, get_session
 from app.models import AuditLog, AuditLogCreate, AuditAction
 
+settings = get_settings()
+
 
 class AuditService:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: Optional[AsyncSession]):
         self.session = session
     
     async def log(
@@ -16,23 +23,21 @@ class AuditService:
         resource_id: Optional[str] = None,
         details: Optional[str] = None,
         ip_address: Optional[str] = None
-    ) -> AuditLog:
-        """Create an immutable audit log entry."""
-        audit_log = AuditLog(
-            user_id=user_id,
-            action=action,
-            resource_type=resource_type,
-            resource_id=resource_id,
-            details=details,
-            ip_address=ip_address,
-            created_at=datetime.utcnow()
+    ) -> None:
+        """Create an immutable audit log entry (Core INSERT, no ORM bookkeeping)."""
+        await self.session.execute(
+            insert(AuditLog).values(
+                user_id=user_id,
+                action=action,
+                resource_type=resource_type,
+                resource_id=resource_id,
+                details=details,
+                ip_address=ip_address
+            )
         )
-        self.session.add(audit_log)
         await self.session.commit()
-        await self.session.refresh(audit_log)
-        return audit_log
     
-    async def log_login(self, user_id: str, ip_address: Optional[str] = None) -> AuditLog:
+    async def log_login(self, user_id: str, ip_address: Optional[str] = None) -> None:
         return await self.log(
             user_id=user_id,
             action=AuditAction.LOGIN,
@@ -42,7 +47,7 @@ class AuditService:
     
     async def log_appointment_view(
         self, user_id: str, appointment_id: str, ip_address: Optional[str] = None
-    ) -> AuditLog:
+    ) -> None:
         return await self.log(
             user_id=user_id,
             action=AuditAction.VIEW_APPOINTMENT,
@@ -53,7 +58,7 @@ class AuditService:
     
     async def log_interview_join(
         self, user_id: str, appointment_id: str, ip_address: Optional[str] = None
-    ) -> AuditLog:
+    ) -> None:
         return await self.log(
             user_id=user_id,
             action=AuditAction.JOIN_INTERVIEW,
@@ -64,7 +69,7 @@ class AuditService:
     
     async def log_consent(
         self, user_id: str, appointment_id: str, granted: bool, ip_address: Optional[str] = None
-    ) -> AuditLog:
+    ) -> None:
         return await self.log(
             user_id=user_id,
             action=AuditAction.GRANT_CONSENT if granted else AuditAction.DENY_CONSENT,
@@ -75,7 +80,7 @@ class AuditService:
     
     async def log_recording_start(
         self, user_id: str, interview_id: str, ip_address: Optional[str] = None
-    ) -> AuditLog:
+    ) -> None:
         return await self.log(
             user_id=user_id,
             action=AuditAction.START_RECORDING,
@@ -86,7 +91,7 @@ class AuditService:
     
     async def log_recording_stop(
         self, user_id: str, interview_id: str, ip_address: Optional[str] = None
-    ) -> AuditLog:
+    ) -> None:
         return await self.log(
             user_id=user_id,
             action=AuditAction.STOP_RECORDING,
@@ -96,5 +101,105 @@ class AuditService:
         )
 
 
-def get_audit_service(session: AsyncSession) -> AuditService:
+class BackgroundAuditService(AuditService):
+    """Audit service for BackgroundTasks.
+    
+    Entries are queued and a consumer task writes them in batches (one
+    multi-row INSERT per batch) on its own session, so logging costs the
+    request neither a round-trip nor its session. Call close() on shutdown
+    to flush whatever is still queued.
+    """
+    
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.2):
+        super().__init__(session=None)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+    
+    async def log(
+        self,
+        user_id: str,
+        action: AuditAction,
+        resource_type: str,
+        resource_id: Optional[str] = None,
+        details: Optional[str] = None,
+        ip_address: Optional[str] = None
+    ) -> None:
+        """Queue an immutable audit log entry for the next batch.
+        
+        created_at is stamped here rather than by the column default, which
+        would record when the batch was written, not when the event happened.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.batch_size * 100)
+        if self._consumer is None or self._consumer.done():
+            self._consumer = asyncio.create_task(self._consume())
+        
+        await self._queue.put({
+            "user_id": user_id,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "details": details,
+            "ip_address": ip_address,
+            "created_at": datetime.utcnow()
+        })
+    
+    async def close(self):
+        """Flush queued entries and stop the consumer."""
+        if self._consumer is None or self._consumer.done():
+            return
+        await self._queue.put(None)
+        await self._consumer
+    
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            row = await self._queue.get()
+            if row is None:
+                return
+            rows = [row]
+            
+            # Collect up to batch_size entries or until flush_interval passes
+            deadline = loop.time() + self.flush_interval
+            stopping = False
+            while len(rows) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                rows.append(row)
+            
+            await self._write(rows)
+            if stopping:
+                return
+    
+    async def _write(self, rows: List[dict]):
+        try:
+            async with async_session() as session:
+                await session.execute(insert(AuditLog), rows)
+                await session.commit()
+        except Exception as e:
+            print(f"Failed to write {len(rows)} audit log entries: {e}")
+
+
+def get_audit_service(session: AsyncSession = Depends(get_session)) -> AuditService:
+    """Request dependency; shares the (per-request cached) handler session."""
     return AuditService(session)
+
+
+_background_audit_service = BackgroundAuditService(
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval_ms / 1000
+)
+
+
+def get_background_audit_service() -> BackgroundAuditService:
+    return _background_audit_service
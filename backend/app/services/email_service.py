@@ -2,40 +2,26 @@
 Email Service for CARE Platform
 Handles all email notifications for appointments, reminders, and alerts.
 """
-import smtplib
+import asyncio
+import base64
 import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import secrets
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional
+from email.header import Header
+from functools import lru_cache
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional, Tuple
 from app.core.config import get_settings
 
+if TYPE_CHECKING:
+    import aiosmtplib
+
 settings = get_settings()
 
 
-class EmailService:
-    """Service for sending email notifications."""
-    
-    def __init__(self):
-        settings = get_settings()
-        # Email configuration from settings
-        self.smtp_host = settings.smtp_host
-        self.smtp_port = settings.smtp_port
-        self.smtp_user = settings.smtp_user
-        self.smtp_password = settings.smtp_password
-        self.from_email = settings.from_email
-        self.from_name = "CARE Platform"
-        
-        # Validate SMTP configuration
-        if not self.smtp_user or not self.smtp_password:
-            raise ValueError(
-                "SMTP credentials not configured. "
-                "Please set SMTP_USER and SMTP_PASSWORD in .env file"
-            )
-    
-    def _get_base_template(self, content: str, title: str) -> str:
-        """Generate base HTML email template."""
-        return f"""
+# Email page shell, split around the per-message body once at import
+_HEADER = """
         <!DOCTYPE html>
         <html>
         <head>
@@ -58,7 +44,8 @@ class EmailService:
                             <!-- Content -->
                             <tr>
                                 <td style="padding: 40px 30px;">
-                                    {content}
+                                    """
+_FOOTER = """
                                 </td>
                             </tr>
                             <!-- Footer -->
@@ -80,28 +67,207 @@ class EmailService:
         </body>
         </html>
         """
+
+
+@lru_cache(maxsize=256)
+def _encode_header(value: str) -> str:
+    """RFC 2047-encode a header value; subjects repeat per notification type."""
+    return Header(value, "utf-8").encode()
+
+
+@lru_cache(maxsize=1024)
+def _format_time(dt: datetime, fmt: str) -> str:
+    """strftime, memoized; reminder bursts share a handful of slot times."""
+    return dt.strftime(fmt)
+
+
+class EmailService:
+    """Service for sending email notifications.
+    
+    Keeps up to smtp_pool_size authenticated SMTP connections open and
+    reuses them across sends, so bulk reminder runs pay the TCP + STARTTLS
+    + AUTH handshake once per connection rather than once per email.
+    
+    The send_* helpers are fire-and-forget: they queue the rendered email
+    and return None without waiting for delivery. send_email sends inline
+    and reports success.
+    """
+    
+    def __init__(self):
+        # Email configuration from settings
+        self.smtp_host = settings.smtp_host
+        self.smtp_port = settings.smtp_port
+        self.smtp_user = settings.smtp_user
+        self.smtp_password = settings.smtp_password
+        self.from_email = settings.from_email
+        self.from_name = "CARE Platform"
+        
+        # Imported here because aiosmtplib takes ~50 ms to load and only
+        # processes that actually send mail need it
+        import aiosmtplib
+        self._smtp = aiosmtplib
+        
+        self.pool_size = settings.smtp_pool_size
+        self.max_messages_per_connection = settings.smtp_max_messages_per_connection
+        self.idle_timeout = settings.smtp_idle_timeout_seconds
+        # Idle (connection, messages_sent, last_used) entries; created on
+        # first send so they bind to the running event loop
+        self._idle: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        # Outgoing (to, subject, html, plain) entries drained by _sender
+        # tasks, so request handlers never wait on SMTP
+        self._outbox: Optional[asyncio.Queue] = None
+        self._senders: List[asyncio.Task] = []
+        self.send_retries = settings.smtp_send_retries
+        
+        # Validate SMTP configuration
+        if not self.smtp_user or not self.smtp_password:
+            raise ValueError(
+                "SMTP credentials not configured. "
+                "Please set SMTP_USER and SMTP_PASSWORD in .env file"
+            )
+    
+    async def _connect(self) -> "aiosmtplib.SMTP":
+        server = self._smtp.SMTP(hostname=self.smtp_host, port=self.smtp_port, start_tls=True)
+        await server.connect()
+        await server.login(self.smtp_user, self.smtp_password)
+        return server
+    
+    async def _checkout(self) -> Tuple["aiosmtplib.SMTP", int]:
+        """Reuse a live idle connection, or open a new one."""
+        while not self._idle.empty():
+            server, sent, last_used = self._idle.get_nowait()
+            if time.monotonic() - last_used < self.idle_timeout:
+                try:
+                    await server.noop()  # detect sockets the server dropped
+                    return server, sent
+                except self._smtp.SMTPException:
+                    pass
+            server.close()
+        return await self._connect(), 0
+    
+    @asynccontextmanager
+    async def _get_conn(self) -> AsyncIterator["aiosmtplib.SMTP"]:
+        """Borrow a pooled connection for one message."""
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.pool_size)
+        
+        async with self._slots:
+            server, sent = await self._checkout()
+            try:
+                yield server
+            except BaseException:
+                server.close()  # state unknown after a failed send
+                raise
+            sent += 1
+            if sent >= self.max_messages_per_connection:
+                try:
+                    await server.quit()
+                except self._smtp.SMTPException:
+                    server.close()
+            else:
+                self._idle.put_nowait((server, sent, time.monotonic()))
+    
+    async def queue_email(self, to_email: str, subject: str, html_content: str, plain_content: Optional[str] = None) -> None:
+        """Hand an email to the background senders (fire-and-forget).
+        
+        Returns once the email is queued. Delivery happens later in _sender,
+        which retries transient failures and logs the rest; callers are
+        never told whether the email arrived.
+        """
+        if self._outbox is None:
+            self._outbox = asyncio.Queue(maxsize=settings.email_queue_size)
+        self._senders = [t for t in self._senders if not t.done()]
+        while len(self._senders) < self.pool_size:
+            self._senders.append(asyncio.create_task(self._sender()))
+        
+        # Blocks only when the backlog is full, pushing back on producers
+        await self._outbox.put((to_email, subject, html_content, plain_content))
+    
+    async def _sender(self):
+        """Deliver queued emails through the pool, retrying transient failures."""
+        while True:
+            item = await self._outbox.get()
+            if item is None:
+                return
+            for attempt in range(self.send_retries + 1):
+                try:
+                    await self._deliver(*item)
+                    break
+                except Exception as e:
+                    if not self._is_transient(e) or attempt == self.send_retries:
+                        print(f"❌ Failed to send email to {item[0]}, dropping it: {e}")
+                        break
+                    print(f"⚠️ Retrying email to {item[0]} after: {e}")
+                    await asyncio.sleep(2 ** attempt)
+    
+    def _is_transient(self, exc: Exception) -> bool:
+        """Worth retrying: network errors and 4xx replies. 5xx rejections
+        (refused recipient, bad credentials) fail the same way every time."""
+        if isinstance(exc, self._smtp.SMTPRecipientsRefused):
+            return any(400 <= refused.code < 500 for refused in exc.recipients)
+        if isinstance(exc, self._smtp.SMTPResponseException):
+            return 400 <= exc.code < 500
+        return isinstance(exc, OSError)  # connect, disconnect and timeout errors
+    
+    async def close(self):
+        """Deliver queued emails, then close pooled connections (app shutdown)."""
+        if self._senders:
+            for _ in self._senders:
+                await self._outbox.put(None)
+            await asyncio.gather(*self._senders, return_exceptions=True)
+            self._senders = []
+        while self._idle is not None and not self._idle.empty():
+            server, _, _ = self._idle.get_nowait()
+            try:
+                await server.quit()
+            except self._smtp.SMTPException:
+                server.close()
+    
+    def _build_message(self, to_email: str, subject: str, html_content: str, plain_content: Optional[str]) -> bytes:
+        """Serialize a multipart/alternative message straight to RFC 5322 bytes.
+        
+        Skips building an email.mime tree and flattening it through
+        email.generator on every send; aiosmtplib normalizes line endings
+        and dot-stuffs the DATA payload itself.
+        """
+        boundary = f"=_{secrets.token_hex(12)}"  # "=_" never occurs in base64
+        parts = [
+            f"From: {self.from_name} <{self.from_email}>\r\n"
+            f"To: {to_email}\r\n"
+            f"Subject: {_encode_header(subject)}\r\n"
+            "MIME-Version: 1.0\r\n"
+            f'Content-Type: multipart/alternative; boundary="{boundary}"\r\n'
+            "\r\n".encode()
+        ]
+        # Plain text fallback first, so clients prefer the HTML part
+        for subtype, body in (("plain", plain_content), ("html", html_content)):
+            if body:
+                parts.append(
+                    f"--{boundary}\r\n"
+                    f'Content-Type: text/{subtype}; charset="utf-8"\r\n'
+                    "Content-Transfer-Encoding: base64\r\n"
+                    "\r\n".encode()
+                )
+                parts.append(base64.encodebytes(body.encode()))
+        parts.append(f"--{boundary}--\r\n".encode())
+        return b"".join(parts)
+    
+    async def _deliver(self, to_email: str, subject: str, html_content: str, plain_content: Optional[str] = None):
+        """Send one email over a pooled connection; raises on failure."""
+        message = self._build_message(to_email, subject, html_content, plain_content)
+        
+        # aiosmtplib yields to the event loop during connect, TLS, AUTH and DATA
+        async with self._get_conn() as server:
+            await server.sendmail(self.from_email, [to_email], message)
+        
+        print(f" Email sent to {to_email}: {subject}")
     
     async def send_email(self, to_email: str, subject: str, html_content: str, plain_content: Optional[str] = None) -> bool:
         """Send an email via SMTP."""
         try:
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = f"{self.from_name} <{self.from_email}>"
-            msg["To"] = to_email
-            
-            # Plain text fallback
-            if plain_content:
-                msg.attach(MIMEText(plain_content, "plain"))
-            
-            # HTML content
-            msg.attach(MIMEText(html_content, "html"))
-            
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_user, self.smtp_password)
-                server.sendmail(self.from_email, to_email, msg.as_string())
-            
-            print(f" Email sent to {to_email}: {subject}")
+            await self._deliver(to_email, subject, html_content, plain_content)
             return True
         except Exception as e:
             print(f"❌ Failed to send email to {to_email}: {e}")
@@ -117,9 +283,9 @@ class EmailService:
         scheduled_time: datetime,
         meeting_number: str,
         reason: str
-    ) -> bool:
+    ) -> None:
         """Send appointment booking confirmation to patient."""
-        formatted_time = scheduled_time.strftime("%B %d, %Y at %I:%M %p")
+        formatted_time = _format_time(scheduled_time, "%B %d, %Y at %I:%M %p")
         
         content = f"""
         <h2 style="color: #1e293b; margin: 0 0 20px 0;">Appointment Booked Successfully! ✅</h2>
@@ -163,8 +329,8 @@ class EmailService:
         </div>
         """
         
-        html = self._get_base_template(content, "Appointment Booked - CARE Platform")
-        return await self.send_email(patient_email, "🏥 Appointment Booked - CARE Platform", html)
+        html = _HEADER.format(title="Appointment Booked - CARE Platform") + content + _FOOTER
+        await self.queue_email(patient_email, "🏥 Appointment Booked - CARE Platform", html)
     
     async def send_appointment_booking_doctor(
         self,
@@ -175,9 +341,9 @@ class EmailService:
         scheduled_time: datetime,
         meeting_number: str,
         reason: str
-    ) -> bool:
+    ) -> None:
         """Send new appointment notification to doctor."""
-        formatted_time = scheduled_time.strftime("%B %d, %Y at %I:%M %p")
+        formatted_time = _format_time(scheduled_time, "%B %d, %Y at %I:%M %p")
         phone_display = patient_phone or "Not provided"
         
         content = f"""
@@ -221,8 +387,8 @@ class EmailService:
         </div>
         """
         
-        html = self._get_base_template(content, "New Appointment - CARE Platform")
-        return await self.send_email(doctor_email, "📋 New Appointment Request - CARE Platform", html)
+        html = _HEADER.format(title="New Appointment - CARE Platform") + content + _FOOTER
+        await self.queue_email(doctor_email, "📋 New Appointment Request - CARE Platform", html)
     
     async def send_appointment_confirmed_patient(
         self,
@@ -231,9 +397,9 @@ class EmailService:
         doctor_name: str,
         scheduled_time: datetime,
         meeting_number: str
-    ) -> bool:
+    ) -> None:
         """Send appointment confirmation to patient when doctor confirms."""
-        formatted_time = scheduled_time.strftime("%B %d, %Y at %I:%M %p")
+        formatted_time = _format_time(scheduled_time, "%B %d, %Y at %I:%M %p")
         
         content = f"""
         <h2 style="color: #1e293b; margin: 0 0 20px 0;">Appointment Confirmed! 🎉</h2>
@@ -275,8 +441,8 @@ class EmailService:
         </div>
         """
         
-        html = self._get_base_template(content, "Appointment Confirmed - CARE Platform")
-        return await self.send_email(patient_email, " Appointment Confirmed - CARE Platform", html)
+        html = _HEADER.format(title="Appointment Confirmed - CARE Platform") + content + _FOOTER
+        await self.queue_email(patient_email, " Appointment Confirmed - CARE Platform", html)
     
     async def send_appointment_cancelled(
         self,
@@ -286,9 +452,9 @@ class EmailService:
         scheduled_time: datetime,
         meeting_number: str,
         cancelled_by: str
-    ) -> bool:
+    ) -> None:
         """Send appointment cancellation notification."""
-        formatted_time = scheduled_time.strftime("%B %d, %Y at %I:%M %p")
+        formatted_time = _format_time(scheduled_time, "%B %d, %Y at %I:%M %p")
         
         content = f"""
         <h2 style="color: #dc2626; margin: 0 0 20px 0;">Appointment Cancelled ❌</h2>
@@ -321,8 +487,8 @@ class EmailService:
         </p>
         """
         
-        html = self._get_base_template(content, "Appointment Cancelled - CARE Platform")
-        return await self.send_email(email, "❌ Appointment Cancelled - CARE Platform", html)
+        html = _HEADER.format(title="Appointment Cancelled - CARE Platform") + content + _FOOTER
+        await self.queue_email(email, "❌ Appointment Cancelled - CARE Platform", html)
     
     # ==================== Reminder Emails ====================
     
@@ -335,9 +501,9 @@ class EmailService:
         meeting_number: str,
         is_doctor: bool,
         time_until: str  # e.g., "1 hour", "15 minutes"
-    ) -> bool:
+    ) -> None:
         """Send upcoming appointment reminder."""
-        formatted_time = scheduled_time.strftime("%B %d, %Y at %I:%M %p")
+        formatted_time = _format_time(scheduled_time, "%B %d, %Y at %I:%M %p")
         role_label = "Patient" if is_doctor else "Doctor"
         
         content = f"""
@@ -383,8 +549,8 @@ class EmailService:
         </div>
         """
         
-        html = self._get_base_template(content, "Appointment Reminder - CARE Platform")
-        return await self.send_email(email, f"⏰ Reminder: Appointment in {time_until} - CARE Platform", html)
+        html = _HEADER.format(title="Appointment Reminder - CARE Platform") + content + _FOOTER
+        await self.queue_email(email, f"⏰ Reminder: Appointment in {time_until} - CARE Platform", html)
     
     async def send_doctor_waiting_alert(
         self,
@@ -394,9 +560,9 @@ class EmailService:
         scheduled_time: datetime,
         meeting_number: str,
         waiting_minutes: int
-    ) -> bool:
+    ) -> None:
         """Send urgent alert to doctor when patient is waiting."""
-        formatted_time = scheduled_time.strftime("%I:%M %p")
+        formatted_time = _format_time(scheduled_time, "%I:%M %p")
         
         content = f"""
         <h2 style="color: #dc2626; margin: 0 0 20px 0;">🚨 Patient Waiting - Urgent!</h2>
@@ -439,8 +605,8 @@ class EmailService:
         </p>
         """
         
-        html = self._get_base_template(content, "URGENT: Patient Waiting - CARE Platform")
-        return await self.send_email(doctor_email, "🚨 URGENT: Patient Waiting for Consultation - CARE Platform", html)
+        html = _HEADER.format(title="URGENT: Patient Waiting - CARE Platform") + content + _FOOTER
+        await self.queue_email(doctor_email, "🚨 URGENT: Patient Waiting for Consultation - CARE Platform", html)
     
     async def send_patient_notified_waiting(
         self,
@@ -448,7 +614,7 @@ class EmailService:
         patient_name: str,
         doctor_name: str,
         meeting_number: str
-    ) -> bool:
+    ) -> None:
         """Notify patient that doctor has been alerted about the wait."""
         content = f"""
         <h2 style="color: #3b82f6; margin: 0 0 20px 0;">Doctor Notified 📢</h2>
@@ -472,8 +638,8 @@ class EmailService:
         </p>
         """
         
-        html = self._get_base_template(content, "Doctor Notified - CARE Platform")
-        return await self.send_email(patient_email, "📢 Doctor Has Been Notified - CARE Platform", html)
+        html = _HEADER.format(title="Doctor Notified - CARE Platform") + content + _FOOTER
+        await self.queue_email(patient_email, "📢 Doctor Has Been Notified - CARE Platform", html)
 
 
 # Singleton instance
@@ -484,3 +650,9 @@ def get_email_service() -> EmailService:
     if _email_service is None:
         _email_service = EmailService()
     return _email_service
+
+
+async def close_email_service():
+    """Flush queued emails and close pooled SMTP connections, if the service was ever created."""
+    if _email_service is not None:
+        await _email_service.close()
@@ -1,5 +1,7 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
+from sqlalchemy import exists, insert
+from sqlalchemy.orm import joinedload
 from sqlmodel import select, Session
 from app.models import Appointment, Notification, NotificationType, User, AppointmentStatus
 from app.services.email_service import get_email_service, EmailService
@@ -13,7 +15,7 @@ class NotificationService:
     async def notify_appointment_booking(self, appointment: Appointment, patient: User, doctor: User):
         """Send booking notification to both patient and doctor when appointment is created."""
         
-        # Email to Patient
+        # Queue emails to both parties; delivery happens in the background
         await self.email_service.send_appointment_booking_patient(
             patient_email=patient.email,
             patient_name=patient.full_name,
@@ -22,17 +24,6 @@ class NotificationService:
             meeting_number=appointment.meeting_number,
             reason=appointment.reason
         )
-        
-        # Store notification for patient
-        notif_patient = Notification(
-            user_id=patient.id,
-            appointment_id=appointment.id,
-            type=NotificationType.APPOINTMENT_BOOKING,
-            message=f"Your appointment with Dr. {doctor.full_name} has been booked for {appointment.scheduled_time.strftime('%B %d, %Y at %I:%M %p')}. Waiting for doctor confirmation."
-        )
-        self.session.add(notif_patient)
-        
-        # Email to Doctor
         await self.email_service.send_appointment_booking_doctor(
             doctor_email=doctor.email,
             doctor_name=doctor.full_name,
@@ -43,6 +34,15 @@ class NotificationService:
             reason=appointment.reason
         )
         
+        # Store notification for patient
+        notif_patient = Notification(
+            user_id=patient.id,
+            appointment_id=appointment.id,
+            type=NotificationType.APPOINTMENT_BOOKING,
+            message=f"Your appointment with Dr. {doctor.full_name} has been booked for {appointment.scheduled_time.strftime('%B %d, %Y at %I:%M %p')}. Waiting for doctor confirmation."
+        )
+        self.session.add(notif_patient)
+        
         # Store notification for doctor
         notif_doctor = Notification(
             user_id=doctor.id,
@@ -88,7 +88,7 @@ class NotificationService:
         
         cancelled_by = "the doctor" if cancelled_by_role == "doctor" else "the patient"
         
-        # Email to Patient
+        # Queue emails to both parties; delivery happens in the background
         await self.email_service.send_appointment_cancelled(
             email=patient.email,
             name=patient.full_name,
@@ -97,6 +97,14 @@ class NotificationService:
             meeting_number=appointment.meeting_number,
             cancelled_by=cancelled_by
         )
+        await self.email_service.send_appointment_cancelled(
+            email=doctor.email,
+            name=f"Dr. {doctor.full_name}",
+            other_party_name=patient.full_name,
+            scheduled_time=appointment.scheduled_time,
+            meeting_number=appointment.meeting_number,
+            cancelled_by=cancelled_by
+        )
         
         # Store notification for patient
         notif_patient = Notification(
@@ -107,16 +115,6 @@ class NotificationService:
         )
         self.session.add(notif_patient)
         
-        # Email to Doctor
-        await self.email_service.send_appointment_cancelled(
-            email=doctor.email,
-            name=f"Dr. {doctor.full_name}",
-            other_party_name=patient.full_name,
-            scheduled_time=appointment.scheduled_time,
-            meeting_number=appointment.meeting_number,
-            cancelled_by=cancelled_by
-        )
-        
         # Store notification for doctor
         notif_doctor = Notification(
             user_id=doctor.id,
@@ -145,32 +143,35 @@ class NotificationService:
         else:
             time_until = "24 hours"
         
-        # Find confirmed appointments in the target window
-        statement = select(Appointment).where(
-            Appointment.status == AppointmentStatus.CONFIRMED,
-            Appointment.scheduled_time >= target_time_start,
-            Appointment.scheduled_time <= target_time_end
+        # Find confirmed appointments in the target window that have not had
+        # this reminder yet, joined to both parties in a single round-trip
+        statement = (
+            select(Appointment)
+            .options(
+                joinedload(Appointment.doctor, innerjoin=True),
+                joinedload(Appointment.patient, innerjoin=True)
+            )
+            .where(
+                Appointment.status == AppointmentStatus.CONFIRMED,
+                Appointment.scheduled_time >= target_time_start,
+                Appointment.scheduled_time <= target_time_end,
+                ~exists().where(
+                    Notification.appointment_id == Appointment.id,
+                    Notification.type == reminder_type
+                )
+            )
         )
         results = await self.session.execute(statement)
         appointments = results.scalars().all()
         
         count = 0
+        notif_rows: List[dict] = []
         for appointment in appointments:
-            # Check if we already sent this type of reminder
-            stmt_notif = select(Notification).where(
-                Notification.appointment_id == appointment.id,
-                Notification.type == reminder_type
-            )
-            existing = await self.session.execute(stmt_notif)
-            if existing.scalar_one_or_none():
-                continue
-            
-            # Fetch users
-            patient = await self.session.get(User, appointment.patient_id)
-            doctor = await self.session.get(User, appointment.doctor_id)
+            patient = appointment.patient
+            doctor = appointment.doctor
             
             if patient and doctor:
-                # Send reminder to patient
+                # Queue reminders to patient and doctor; delivered in the background
                 await self.email_service.send_upcoming_reminder(
                     email=patient.email,
                     name=patient.full_name,
@@ -180,16 +181,6 @@ class NotificationService:
                     is_doctor=False,
                     time_until=time_until
                 )
-                
-                notif_patient = Notification(
-                    user_id=patient.id,
-                    appointment_id=appointment.id,
-                    type=reminder_type,
-                    message=f"Reminder: Your appointment with Dr. {doctor.full_name} is in {time_until}."
-                )
-                self.session.add(notif_patient)
-                
-                # Send reminder to doctor
                 await self.email_service.send_upcoming_reminder(
                     email=doctor.email,
                     name=f"Dr. {doctor.full_name}",
@@ -200,16 +191,24 @@ class NotificationService:
                     time_until=time_until
                 )
                 
-                notif_doctor = Notification(
-                    user_id=doctor.id,
-                    appointment_id=appointment.id,
-                    type=reminder_type,
-                    message=f"Reminder: Your appointment with {patient.full_name} is in {time_until}."
-                )
-                self.session.add(notif_doctor)
+                notif_rows.append({
+                    "user_id": patient.id,
+                    "appointment_id": appointment.id,
+                    "type": reminder_type,
+                    "message": f"Reminder: Your appointment with Dr. {doctor.full_name} is in {time_until}."
+                })
+                notif_rows.append({
+                    "user_id": doctor.id,
+                    "appointment_id": appointment.id,
+                    "type": reminder_type,
+                    "message": f"Reminder: Your appointment with {patient.full_name} is in {time_until}."
+                })
                 
                 count += 1
         
+        # One executemany INSERT for the whole run instead of a row per flush
+        if notif_rows:
+            await self.session.execute(insert(Notification), notif_rows)
         await self.session.commit()
         return count
 
@@ -285,11 +284,16 @@ class NotificationService:
             NotificationType.APPOINTMENT_REMINDER
         )
 
-    async def get_user_notifications(self, user_id: str, limit: int = 20) -> List[Notification]:
-        """Get notifications for a user."""
+    async def get_user_notifications(
+        self, user_id: str, limit: int = 20, unread_only: bool = False
+    ) -> List[Notification]:
+        """Get notifications for a user, newest first."""
         stmt = select(Notification).where(
             Notification.user_id == user_id
         ).order_by(Notification.sent_at.desc()).limit(limit)
+        if unread_only:
+            # Matches the ix_notifications_unread partial index
+            stmt = stmt.where(Notification.read == False)
         
         result = await self.session.execute(stmt)
         return result.scalars().all()
@@ -6,11 +6,8 @@ from datetime import timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from sqlmodel import SQLModel
-
 from app.core.config import get_settings
+from app.core.database import async_session
 from app.services.notification import NotificationService
 from app.models import NotificationType
 
@@ -22,22 +19,11 @@ class NotificationScheduler:
     
     def __init__(self):
         self.scheduler = AsyncIOScheduler()
-        self.engine = None
         self.async_session = None
         
     async def initialize(self):
-        """Initialize database connection for scheduler."""
-        self.engine = create_async_engine(
-            settings.database_url,
-            echo=False,
-            future=True
-        )
-        
-        self.async_session = sessionmaker(
-            self.engine,
-            class_=AsyncSession,
-            expire_on_commit=False
-        )
+        """Attach the scheduler to the app's shared connection pool."""
+        self.async_session = async_session
         
     async def send_24hr_reminders(self):
         """Send reminders for appointments 24 hours away."""
@@ -1,23 +1,43 @@
 import os
 import aiofiles
-import aioboto3
+import aiofiles.os
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import AsyncIterator, Optional
 from datetime import datetime, timedelta
 from app.core.config import get_settings
 
 settings = get_settings()
 
+# Read size used when streaming stored objects back to clients
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class StorageProvider(ABC):
     @abstractmethod
     async def save(self, data: bytes, key: str) -> str:
         pass
     
+    @abstractmethod
+    async def save_stream(self, chunks: AsyncIterator[bytes], key: str) -> str:
+        """Save data arriving as an async stream of chunks (bounded memory)."""
+        pass
+    
     @abstractmethod
     async def get(self, key: str) -> Optional[bytes]:
         pass
     
+    @abstractmethod
+    def open_stream(
+        self, key: str, chunk_size: int = STREAM_CHUNK_SIZE, start: int = 0, end: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """Read a stored object (or bytes start..end inclusive) as an async stream of chunks."""
+        pass
+    
+    @abstractmethod
+    async def get_size(self, key: str) -> Optional[int]:
+        """Size in bytes, or None if the object does not exist."""
+        pass
+    
     @abstractmethod
     async def delete(self, key: str) -> bool:
         pass
@@ -41,34 +61,69 @@ class LocalStorageProvider(StorageProvider):
     def _get_full_path(self, key: str) -> str:
         return os.path.join(self.base_path, key)
     
+    # Every filesystem call below goes through aiofiles' thread pool, so
+    # recording/transcript writes never block the event loop
+    
     async def save(self, data: bytes, key: str) -> str:
         full_path = self._get_full_path(key)
         dir_path = os.path.dirname(full_path)
-        os.makedirs(dir_path, exist_ok=True)
+        await aiofiles.os.makedirs(dir_path, exist_ok=True)
         
         async with aiofiles.open(full_path, 'wb') as f:
             await f.write(data)
         
         return key
     
+    async def save_stream(self, chunks: AsyncIterator[bytes], key: str) -> str:
+        full_path = self._get_full_path(key)
+        await aiofiles.os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        
+        async with aiofiles.open(full_path, 'wb') as f:
+            async for chunk in chunks:
+                await f.write(chunk)
+        
+        return key
+    
     async def get(self, key: str) -> Optional[bytes]:
         full_path = self._get_full_path(key)
-        if not os.path.exists(full_path):
+        try:
+            async with aiofiles.open(full_path, 'rb') as f:
+                return await f.read()
+        except FileNotFoundError:
+            return None
+    
+    async def open_stream(
+        self, key: str, chunk_size: int = STREAM_CHUNK_SIZE, start: int = 0, end: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self._get_full_path(key), 'rb') as f:
+            if start:
+                await f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = await f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+    
+    async def get_size(self, key: str) -> Optional[int]:
+        try:
+            return (await aiofiles.os.stat(self._get_full_path(key))).st_size
+        except FileNotFoundError:
             return None
-        
-        async with aiofiles.open(full_path, 'rb') as f:
-            return await f.read()
     
     async def delete(self, key: str) -> bool:
         full_path = self._get_full_path(key)
-        if os.path.exists(full_path):
-            os.remove(full_path)
+        try:
+            await aiofiles.os.remove(full_path)
             return True
-        return False
+        except FileNotFoundError:
+            return False
     
     async def exists(self, key: str) -> bool:
         full_path = self._get_full_path(key)
-        return os.path.exists(full_path)
+        return await aiofiles.os.path.exists(full_path)
     
     def get_url(self, key: str) -> str:
         return f"/api/storage/{key}"
@@ -85,6 +140,9 @@ class S3StorageProvider(StorageProvider):
     - S3_BUCKET_NAME
     """
     
+    # S3 rejects multipart parts under 5 MiB (except the last one)
+    MULTIPART_PART_SIZE = 8 * 1024 * 1024
+    
     def __init__(
         self,
         bucket: str,
@@ -97,7 +155,9 @@ class S3StorageProvider(StorageProvider):
         self.access_key = access_key
         self.secret_key = secret_key
         
-        # Create aioboto3 session
+        # Create aioboto3 session; imported here because the boto stack takes
+        # ~0.3 s to load and local-storage deployments never need it
+        import aioboto3
         self.session = aioboto3.Session(
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
@@ -120,6 +180,51 @@ class S3StorageProvider(StorageProvider):
                 print(f"S3 upload error: {e}")
                 raise
     
+    async def save_stream(self, chunks: AsyncIterator[bytes], key: str) -> str:
+        """Upload a chunk stream to S3 as a multipart upload"""
+        async with self.session.client('s3') as s3:
+            upload = await s3.create_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                ServerSideEncryption='AES256',  # Encrypt at rest
+                ContentType=self._get_content_type(key)
+            )
+            upload_id = upload['UploadId']
+            parts = []
+            buffer = bytearray()
+            
+            async def upload_part(body: bytes):
+                part_number = len(parts) + 1
+                response = await s3.upload_part(
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=body
+                )
+                parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+            
+            try:
+                async for chunk in chunks:
+                    buffer.extend(chunk)
+                    if len(buffer) >= self.MULTIPART_PART_SIZE:
+                        await upload_part(bytes(buffer))
+                        buffer.clear()
+                if buffer or not parts:
+                    await upload_part(bytes(buffer))
+                
+                await s3.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    MultipartUpload={'Parts': parts}
+                )
+                return key
+            except Exception as e:
+                print(f"S3 upload error: {e}")
+                await s3.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+                raise
+    
     async def get(self, key: str) -> Optional[bytes]:
         """Download file from S3"""
         async with self.session.client('s3') as s3:
@@ -133,6 +238,28 @@ class S3StorageProvider(StorageProvider):
                 print(f"S3 download error: {e}")
                 return None
     
+    async def open_stream(
+        self, key: str, chunk_size: int = STREAM_CHUNK_SIZE, start: int = 0, end: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """Stream a file (or a byte range of it) from S3 without buffering it whole"""
+        params = {'Bucket': self.bucket, 'Key': key}
+        if start or end is not None:
+            params['Range'] = f"bytes={start}-{'' if end is None else end}"
+        async with self.session.client('s3') as s3:
+            response = await s3.get_object(**params)
+            async with response['Body'] as stream:
+                while chunk := await stream.read(chunk_size):
+                    yield chunk
+    
+    async def get_size(self, key: str) -> Optional[int]:
+        """Object size from S3 metadata, or None if missing"""
+        async with self.session.client('s3') as s3:
+            try:
+                response = await s3.head_object(Bucket=self.bucket, Key=key)
+                return response['ContentLength']
+            except Exception:
+                return None
+    
     async def delete(self, key: str) -> bool:
         """Delete file from S3"""
         async with self.session.client('s3') as s3:
@@ -199,8 +326,20 @@ class S3StorageProvider(StorageProvider):
         return content_types.get(ext, 'application/octet-stream')
 
 
+# Singleton instance; the S3 provider's aioboto3 session is reused across requests
+_storage_provider: Optional[StorageProvider] = None
+
+
 def get_storage_provider() -> StorageProvider:
-    """Get configured storage provider (S3 or Local)
+    """Get or create the configured storage provider instance."""
+    global _storage_provider
+    if _storage_provider is None:
+        _storage_provider = _create_storage_provider()
+    return _storage_provider
+
+
+def _create_storage_provider() -> StorageProvider:
+    """Build the configured storage provider (S3 or Local)
     
     If AWS credentials are configured in .env, uses S3.
     Otherwise falls back to local storage.
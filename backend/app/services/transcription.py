@@ -2,8 +2,10 @@ import os
 import tempfile
 import subprocess
 import json
+import itertools
 from datetime import datetime
 from typing import Optional, List, Dict
+from starlette.concurrency import run_in_threadpool
 
 
 class TranscriptionService:
@@ -15,6 +17,12 @@ class TranscriptionService:
     def __init__(self):
         self.model = None
         self._realtime_transcripts: Dict[str, List[str]] = {}
+        # Joined transcript per session, rebuilt only after new chunks arrive
+        self._realtime_joined: Dict[str, str] = {}
+        # Process-wide counter so a session's version never repeats, even
+        # across end/restart of the same appointment
+        self._realtime_versions: Dict[str, int] = {}
+        self._version_counter = itertools.count(1)
         self._load_model()
     
     def _load_model(self):
@@ -45,7 +53,8 @@ class TranscriptionService:
             )
         
         try:
-            result = self.model.transcribe(audio_path, language="en")
+            # Whisper inference is CPU-bound; keep it off the event loop
+            result = await run_in_threadpool(self.model.transcribe, audio_path, language="en")
             return result["text"].strip()
         except Exception as e:
             raise RuntimeError(f"Transcription failed: {str(e)}") from e
@@ -58,7 +67,7 @@ class TranscriptionService:
             with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
                 audio_path = tmp.name
             
-            subprocess.run([
+            await run_in_threadpool(subprocess.run, [
                 "ffmpeg", "-i", video_path,
                 "-vn", "-acodec", "pcm_s16le",
                 "-ar", "16000", "-ac", "1",
@@ -93,18 +102,30 @@ class TranscriptionService:
         timestamp = datetime.utcnow().strftime("%H:%M:%S")
         chunk = f"[{timestamp}] {speaker}: {text}"
         self._realtime_transcripts[appointment_id].append(chunk)
+        self._realtime_joined.pop(appointment_id, None)
+        self._realtime_versions[appointment_id] = next(self._version_counter)
+    
+    def get_realtime_version(self, appointment_id: str) -> int:
+        """Version of the real-time transcript; changes whenever a chunk is added."""
+        return self._realtime_versions.get(appointment_id, 0)
     
     def get_realtime_transcript(self, appointment_id: str) -> str:
         """Get the current real-time transcript."""
         if appointment_id not in self._realtime_transcripts:
             return ""
-        return "\n".join(self._realtime_transcripts[appointment_id])
+        joined = self._realtime_joined.get(appointment_id)
+        if joined is None:
+            joined = "\n".join(self._realtime_transcripts[appointment_id])
+            self._realtime_joined[appointment_id] = joined
+        return joined
     
     def end_realtime_session(self, appointment_id: str) -> str:
         """End the real-time session and return final transcript."""
         transcript = self.get_realtime_transcript(appointment_id)
         if appointment_id in self._realtime_transcripts:
             del self._realtime_transcripts[appointment_id]
+        self._realtime_joined.pop(appointment_id, None)
+        self._realtime_versions.pop(appointment_id, None)
         return transcript
     
     def generate_summary(
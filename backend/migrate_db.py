@@ -1,8 +1,16 @@
 #!/usr/bin/env python3
 """
-Database migration script to add new columns:
+Database migration script to add new columns and indexes:
 - meeting_number to appointments table
-- summary_text, key_points to interviews table
+- summary_text, key_points, transcript_status to interviews table
+- (user_id, created_at, id) index on audit_logs
+- unique appointment_id index on consents
+- list ordering indexes on appointments and users
+- (user_id, sent_at), unread partial and (appointment_id, type) indexes on notifications
+- (status, scheduled_time) index on appointments
+- native uuid type for id, foreign key and room_id columns
+- database-assigned appointment meeting numbers
+- server-side defaults for timestamp columns
 """
 import asyncio
 import os
@@ -14,9 +22,61 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine
 
+from app.models.models import MEETING_NUMBER_DDL
+
 
 DATABASE_URL = "postgresql+asyncpg://ombiradar@localhost:5432/care_platform"
 
+# Columns stored as native uuid instead of VARCHAR
+UUID_COLUMNS = {
+    "users": ["id"],
+    "appointments": ["id", "doctor_id", "patient_id", "room_id"],
+    "notifications": ["id", "user_id", "appointment_id"],
+    "consents": ["id", "appointment_id", "patient_id"],
+    "interviews": ["id", "appointment_id"],
+    "audit_logs": ["id", "user_id"],
+    "chat_messages": ["id", "interview_id", "sender_id"],
+}
+
+# Timestamp columns stamped by the database on INSERT
+TIMESTAMP_COLUMNS = {
+    "users": ["created_at", "updated_at"],
+    "appointments": ["created_at", "updated_at"],
+    "notifications": ["sent_at"],
+    "consents": ["created_at"],
+    "interviews": ["created_at"],
+    "audit_logs": ["created_at"],
+    "chat_messages": ["created_at"],
+}
+
+
+async def convert_ids_to_uuid(conn):
+    """Retype id/foreign key columns to uuid; the foreign keys between them
+    are dropped first and recreated afterwards."""
+    tables = list(UUID_COLUMNS)
+    foreign_keys = (await conn.execute(text("""
+        SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE contype = 'f' AND confrelid::regclass::text = ANY(:tables)
+    """), {"tables": tables})).all()
+    
+    for table, name, _ in foreign_keys:
+        await conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"'))
+    
+    for table, columns in UUID_COLUMNS.items():
+        for column in columns:
+            data_type = (await conn.execute(text("""
+                SELECT data_type FROM information_schema.columns
+                WHERE table_name = :table AND column_name = :column
+            """), {"table": table, "column": column})).scalar()
+            if data_type not in (None, "uuid"):
+                await conn.execute(text(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE uuid USING {column}::uuid"
+                ))
+    
+    for table, name, definition in foreign_keys:
+        await conn.execute(text(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}'))
+
 
 async def migrate():
     engine = create_async_engine(DATABASE_URL, echo=True)
@@ -52,6 +112,22 @@ async def migrate():
         except Exception as e:
             print(f"Note: key_points column - {e}")
         
+        # Add transcript_status column (and its enum type) to interviews
+        try:
+            await conn.execute(text("""
+                DO $$ BEGIN
+                    CREATE TYPE transcriptstatus AS ENUM ('PENDING', 'DONE', 'FAILED');
+                EXCEPTION WHEN duplicate_object THEN NULL;
+                END $$;
+            """))
+            await conn.execute(text("""
+                ALTER TABLE interviews 
+                ADD COLUMN IF NOT EXISTS transcript_status transcriptstatus;
+            """))
+            print(" Added transcript_status column to interviews")
+        except Exception as e:
+            print(f"Note: transcript_status column - {e}")
+        
         # Update existing appointments with meeting numbers
         try:
             await conn.execute(text("""
@@ -64,6 +140,124 @@ async def migrate():
         except Exception as e:
             print(f"Note: updating meeting numbers - {e}")
     
+        # Composite index backing keyset pagination of audit logs
+        try:
+            await conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_audit_logs_user_created_id
+                ON audit_logs (user_id, created_at, id);
+            """))
+            print(" Added ix_audit_logs_user_created_id index to audit_logs")
+        except Exception as e:
+            print(f"Note: ix_audit_logs_user_created_id index - {e}")
+        
+        # One consent per appointment (ON CONFLICT target for consent creation)
+        try:
+            await conn.execute(text("""
+                CREATE UNIQUE INDEX IF NOT EXISTS ix_consents_appointment_id
+                ON consents (appointment_id);
+            """))
+            print(" Added ix_consents_appointment_id unique index to consents")
+        except Exception as e:
+            print(f"Note: ix_consents_appointment_id index - {e}")
+        
+        # Composite indexes backing keyset pagination of appointments
+        try:
+            await conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_appointments_doctor_scheduled_id
+                ON appointments (doctor_id, scheduled_time, id);
+            """))
+            print(" Added ix_appointments_doctor_scheduled_id index to appointments")
+        except Exception as e:
+            print(f"Note: ix_appointments_doctor_scheduled_id index - {e}")
+        
+        try:
+            await conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_appointments_patient_scheduled_id
+                ON appointments (patient_id, scheduled_time, id);
+            """))
+            print(" Added ix_appointments_patient_scheduled_id index to appointments")
+        except Exception as e:
+            print(f"Note: ix_appointments_patient_scheduled_id index - {e}")
+        
+        # Backs the doctor list ordering
+        try:
+            await conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_users_role_full_name
+                ON users (role, full_name, id);
+            """))
+            print(" Added ix_users_role_full_name index to users")
+        except Exception as e:
+            print(f"Note: ix_users_role_full_name index - {e}")
+        
+        # Partial index over unread rows for the unread count, unread list and
+        # mark-all-read; replaces the full (user_id, read) index
+        try:
+            await conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_notifications_unread
+                ON notifications (user_id, sent_at) WHERE read = false;
+            """))
+            await conn.execute(text("DROP INDEX IF EXISTS ix_notifications_user_read;"))
+            print(" Added ix_notifications_unread partial index to notifications")
+        except Exception as e:
+            print(f"Note: ix_notifications_unread index - {e}")
+        
+        # Backs the newest-first notification list per user
+        try:
+            await conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_notifications_user_sent
+                ON notifications (user_id, sent_at);
+            """))
+            print(" Added ix_notifications_user_sent index to notifications")
+        except Exception as e:
+            print(f"Note: ix_notifications_user_sent index - {e}")
+        
+        # Backs the per-appointment reminder dedup checks
+        try:
+            await conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_notifications_appointment_type
+                ON notifications (appointment_id, type);
+            """))
+            print(" Added ix_notifications_appointment_type index to notifications")
+        except Exception as e:
+            print(f"Note: ix_notifications_appointment_type index - {e}")
+        
+        # Backs the scheduler's confirmed-appointments-in-window scan
+        try:
+            await conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_appointments_status_scheduled
+                ON appointments (status, scheduled_time);
+            """))
+            print(" Added ix_appointments_status_scheduled index to appointments")
+        except Exception as e:
+            print(f"Note: ix_appointments_status_scheduled index - {e}")
+        
+        # Native 16-byte uuid keys instead of 36-char VARCHAR
+        try:
+            async with conn.begin_nested():
+                await convert_ids_to_uuid(conn)
+            print(" Converted id and foreign key columns to uuid")
+        except Exception as e:
+            print(f"Note: uuid id columns - {e}")
+        
+        # Meeting numbers come from a sequence-backed BEFORE INSERT trigger
+        try:
+            for statement in MEETING_NUMBER_DDL:
+                await conn.execute(text(statement))
+            print(" Added appointments_meeting_number trigger to appointments")
+        except Exception as e:
+            print(f"Note: appointments_meeting_number trigger - {e}")
+        
+        # Timestamps default to the database clock (naive UTC)
+        try:
+            for table, columns in TIMESTAMP_COLUMNS.items():
+                for column in columns:
+                    await conn.execute(text(
+                        f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT timezone('utc', now())"
+                    ))
+            print(" Added server-side timestamp defaults")
+        except Exception as e:
+            print(f"Note: timestamp defaults - {e}")
+    
     await engine.dispose()
     print("\n🎉 Migration completed successfully!")
 
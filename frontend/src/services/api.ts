@@ -112,6 +112,12 @@ export const interviewsAPI = {
   getTranscript: (appointmentId: string) =>
     api.get(`/interviews/${appointmentId}/transcript`),
 
+  getTranscriptMetadata: (appointmentId: string) =>
+    api.get(`/interviews/${appointmentId}/transcript/metadata`),
+
+  getTranscriptContent: (appointmentId: string) =>
+    api.get(`/interviews/${appointmentId}/transcript/content`, { responseType: 'text' }),
+
   uploadRecording: (appointmentId: string, file: File) => {
     const formData = new FormData();
     formData.append('file', file);
@@ -151,8 +157,15 @@ export const interviewsAPI = {
 
 // Audit API
 export const auditAPI = {
-  list: (params?: { action?: string; resource_type?: string; limit?: number }) =>
-    api.get('/audit/', { params }),
+  // Streamed as NDJSON (one log per line); pass the last row's created_at/id
+  // back as before/before_id for the next page
+  list: (params?: { action?: string; resource_type?: string; limit?: number; before?: string; before_id?: string }) =>
+    api.get('/audit/', {
+      params,
+      responseType: 'text',
+      transformResponse: (data: string) =>
+        data.split('\n').filter(Boolean).map((line) => JSON.parse(line)),
+    }),
 
   getMyActivity: (limit?: number) =>
     api.get('/audit/my-activity', { params: limit ? { limit } : {} }),